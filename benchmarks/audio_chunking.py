@@ -0,0 +1,76 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.audio import SAMPLE_RATE, frame_rms, segment_audio
+
+# Builds a synthetic meeting (noise "utterances" of 2-12 s separated by
+# 0.2-1.5 s pauses) and reports how long chunking takes and how loud the
+# audio is at every cut compared with a fixed-length split.
+
+
+def synthetic_meeting(seconds, seed=0):
+    rng = np.random.default_rng(seed)
+    samples = np.zeros(int(seconds * SAMPLE_RATE), dtype=np.int16)
+    position = 0
+    while position < len(samples):
+        length = int(rng.uniform(2, 12) * SAMPLE_RATE)
+        speech = rng.normal(0, 4000, min(length, len(samples) - position))
+        samples[position : position + len(speech)] = speech.astype(np.int16)
+        position += length + int(rng.uniform(0.2, 1.5) * SAMPLE_RATE)
+    return samples
+
+
+def loudness_at(samples, points, window=0.1):
+    half = int(window * SAMPLE_RATE / 2)
+    return [
+        float(frame_rms(samples[max(point - half, 0) : point + half], 2 * half)[0])
+        for point in points
+        if point + half < len(samples)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MeetingGPT 오디오 분할 속도와 분할 지점의 소리 크기를 측정합니다.")
+    parser.add_argument("--minutes", type=int, default=60)
+    parser.add_argument("--chunk-seconds", type=int, default=600)
+    args = parser.parse_args()
+
+    samples = synthetic_meeting(args.minutes * 60)
+    with tempfile.TemporaryDirectory() as folder:
+        audio_path = os.path.join(folder, "meeting.wav")
+        with wave.open(audio_path, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(SAMPLE_RATE)
+            f.writeframes(samples.tobytes())
+
+        started = time.perf_counter()
+        chunks = list(
+            segment_audio(audio_path, os.path.join(folder, "chunks"), args.chunk_seconds)
+        )
+        elapsed = time.perf_counter() - started
+
+        cuts, position = [], 0
+        for chunk in chunks[:-1]:
+            # Chunks are re-encoded as mp3, so measure their length by decoding.
+            decoded = subprocess.run(
+                ["ffmpeg", "-loglevel", "error", "-i", chunk, "-f", "s16le", "pipe:1"],
+                capture_output=True,
+                check=True,
+            ).stdout
+            position += len(decoded) // 2
+            cuts.append(position)
+
+    fixed = [args.chunk_seconds * SAMPLE_RATE * (i + 1) for i in range(len(cuts))]
+    print(f"{args.minutes} min of audio -> {len(chunks)} chunks in {elapsed:.1f}s")
+    print(f"mean RMS at fixed cuts:  {np.mean(loudness_at(samples, fixed)):8.1f}")
+    print(f"mean RMS at silence cuts: {np.mean(loudness_at(samples, cuts)):8.1f}")
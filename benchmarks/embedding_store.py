@@ -0,0 +1,72 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from langchain.embeddings import CacheBackedEmbeddings, FakeEmbeddings
+from langchain.storage import LocalFileStore
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.stores import packed_cache_backed_embeddings
+
+
+def make_batches(count, dim):
+    rng = np.random.default_rng(0)
+    for start in range(0, count, 1000):
+        vectors = rng.standard_normal((min(1000, count - start), dim))
+        yield [(f"chunk {start + i}", vector.tolist()) for i, vector in enumerate(vectors)]
+
+
+def disk_usage(path):
+    total, files = 0, 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            total += os.path.getsize(os.path.join(root, name))
+            files += 1
+    return total, files
+
+
+def bench(name, make_embeddings, count, dim):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_embeddings(tmp).document_embedding_store
+        started = time.perf_counter()
+        for batch in make_batches(count, dim):
+            store.mset(batch)
+        write = time.perf_counter() - started
+        texts = [f"chunk {i}" for i in range(count)]
+        started = time.perf_counter()
+        for start in range(0, count, 1000):
+            store.mget(texts[start : start + 1000])
+        read = time.perf_counter() - started
+        size, files = disk_usage(tmp)
+    print(
+        f"{name:<16} | {count:>7} | {write:>7.2f}s | {read:>7.2f}s"
+        f" | {size / 2**20:>8.1f} MB | {files:>7}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="임베딩 캐시 저장소를 LocalFileStore와 비교합니다.")
+    parser.add_argument("--counts", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=1536)
+    args = parser.parse_args()
+
+    embeddings = FakeEmbeddings(size=args.dim)
+    candidates = {
+        "LocalFileStore": lambda tmp: CacheBackedEmbeddings.from_bytes_store(
+            embeddings, LocalFileStore(tmp)
+        ),
+        "packed float32": lambda tmp: packed_cache_backed_embeddings(
+            embeddings, os.path.join(tmp, "store.sqlite3")
+        ),
+        "packed float16": lambda tmp: packed_cache_backed_embeddings(
+            embeddings, os.path.join(tmp, "store.sqlite3"), dtype="float16"
+        ),
+    }
+    print("store            |   count |   write |    read |      size |   files")
+    for count in args.counts:
+        for name, make_embeddings in candidates.items():
+            bench(name, make_embeddings, count, args.dim)
@@ -0,0 +1,59 @@
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chef.favorites import SQLiteFavoritesStore
+
+
+async def run_worker(path, worker, operations, concurrency):
+    store = SQLiteFavoritesStore(path)
+
+    async def client(client_id):
+        token = f"token-{worker}-{client_id % 8}"
+        for i in range(operations // concurrency):
+            await store.add(token, f"food-{i % 200}")
+            await store.get(token)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await store.close()
+    return elapsed
+
+
+def worker_main(args):
+    return asyncio.run(run_worker(*args))
+
+
+def bench(workers, operations, concurrency):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "favorites.sqlite3")
+        SQLiteFavoritesStore(path).writer.close()
+        with Pool(workers) as pool:
+            elapsed = max(
+                pool.map(
+                    worker_main,
+                    [(path, i, operations, concurrency) for i in range(workers)],
+                )
+            )
+    total = workers * (operations // concurrency) * concurrency
+    return total / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite 즐겨찾기 저장소의 add/get 처리량을 측정합니다.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--operations", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    print("workers | add+get pairs/s")
+    for workers in args.workers:
+        rate = bench(workers, args.operations, args.concurrency)
+        print(f"{workers:>7} | {rate:,.0f}")
@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chef.keyword_index import KeywordRecipeIndex, reciprocal_rank_fusion
+from chef.recipe_index import DEFAULT_INDEX_PATH, LocalRecipeIndex
+
+QUERIES = [
+    "chickpea spinach coconut milk",
+    "tofu soy sauce ginger",
+    "potato onion garlic",
+    "lentils tomato cumin",
+    "rice peas carrot",
+]
+
+
+def measure(name, search, repeat):
+    started = time.perf_counter()
+    for i in range(repeat):
+        search(QUERIES[i % len(QUERIES)])
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"{name:<24} | {elapsed * 1e6:>10.1f} µs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="/recipes 검색 모드별 지연 시간을 비교합니다.")
+    parser.add_argument("--csv", default="recipes.csv")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH)
+    parser.add_argument("--repeat", type=int, default=1000)
+    parser.add_argument("--embed", action="store_true", help="OpenAI 임베딩 호출도 측정합니다.")
+    args = parser.parse_args()
+
+    keyword_index = KeywordRecipeIndex.from_csv(args.csv)
+    print("mode                     |    latency")
+    measure("keyword", lambda query: keyword_index.search(query), args.repeat)
+
+    if os.path.exists(args.index):
+        vector_index = LocalRecipeIndex(args.index, None)
+        query_vectors = np.asarray(vector_index.vectors[: len(QUERIES)])
+
+        def vector_search(query):
+            return vector_index.similarity_search_by_vector(
+                query_vectors[QUERIES.index(query)], k=20
+            )
+
+        def hybrid_search(query):
+            return reciprocal_rank_fusion(
+                [vector_search(query), keyword_index.search(query, k=20)]
+            )
+
+        measure("vector (cached query)", vector_search, args.repeat)
+        measure("hybrid (cached query)", hybrid_search, args.repeat)
+
+        if args.embed:
+            from dotenv import load_dotenv
+            from langchain.embeddings import OpenAIEmbeddings
+
+            load_dotenv()
+            embeddings = OpenAIEmbeddings()
+            measure("query embedding call", embeddings.embed_query, len(QUERIES))
+    else:
+        print(f"{args.index}에 로컬 인덱스가 없어서 vector/hybrid 측정을 건너뜁니다.")
@@ -0,0 +1,59 @@
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.stores import packed_cache_backed_embeddings
+
+# Eval set: one JSON object per line, {"a": ..., "b": ..., "same": bool}, where
+# "same" means an answer to "a" is a correct answer to "b". Serving a cached
+# answer for a pair that is not "same" is a wrong answer, so the threshold is
+# the lowest one with no false hits on the set.
+DEFAULT_PAIRS = os.path.join(os.path.dirname(__file__), "data", "site_cache_pairs.jsonl")
+
+
+def cosine_scores(embeddings, pairs):
+    texts = list(dict.fromkeys(text for pair in pairs for text in (pair["a"], pair["b"])))
+    vectors = np.array(embeddings.embed_documents(texts), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index = {text: i for i, text in enumerate(texts)}
+    return np.array(
+        [vectors[index[pair["a"]]] @ vectors[index[pair["b"]]] for pair in pairs]
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SiteGPT 답변 캐시의 유사도 임계값을 평가합니다.")
+    parser.add_argument("--pairs", default=DEFAULT_PAIRS, help="평가용 JSONL 파일")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from langchain.embeddings import OpenAIEmbeddings
+
+    load_dotenv()
+    with open(args.pairs, encoding="utf-8") as f:
+        pairs = [json.loads(line) for line in f if line.strip()]
+    embeddings = packed_cache_backed_embeddings(
+        OpenAIEmbeddings(), "./.cache/site_embeddings.sqlite3"
+    )
+    scores = cosine_scores(embeddings, pairs)
+    same = np.array([pair["same"] for pair in pairs])
+
+    print("threshold | cache hits | false hits | recall")
+    recommended = None
+    for threshold in np.arange(0.80, 1.0, 0.01):
+        hits = scores >= threshold
+        false_hits = int((hits & ~same).sum())
+        recall = (hits & same).sum() / max(same.sum(), 1)
+        print(f"{threshold:9.2f} | {int(hits.sum()):10} | {false_hits:10} | {recall:6.0%}")
+        if recommended is None and false_hits == 0:
+            recommended = threshold
+    print(f"closest different pair: {scores[~same].max():.3f}")
+    if recommended is None:
+        print("no threshold below 1.0 avoids every false hit")
+    else:
+        print(f"recommended threshold: {recommended:.2f}")
@@ -0,0 +1,65 @@
+import argparse
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.rerank import LexicalReranker
+from utils.site_index import build_manifest
+from utils.vectorstores import load_faiss
+
+# Eval set: one JSON object per line, {"question": ..., "source": <expected page URL>}.
+# The committed set asks about the Workers AI, AI Gateway and Vectorize pages
+# of DEFAULT_URL, so the index for that sitemap has to be built in SiteGPT first.
+DEFAULT_URL = "https://developers.cloudflare.com/sitemap.xml"
+DEFAULT_EVAL = os.path.join(os.path.dirname(__file__), "data", "site_rerank_eval.jsonl")
+
+
+def hit(docs, source):
+    return any(doc.metadata["source"] == source for doc in docs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SiteGPT 재정렬 단계의 검색 품질과 LLM 호출 수를 비교합니다.")
+    parser.add_argument("--url", default=DEFAULT_URL, help="인덱싱된 사이트맵 URL")
+    parser.add_argument("--eval", default=DEFAULT_EVAL, help="평가용 JSONL 파일")
+    parser.add_argument("--baseline-k", type=int, default=4)
+    parser.add_argument("--retrieve-k", type=int, default=20)
+    parser.add_argument("--top-n", type=int, default=3)
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from langchain.embeddings import OpenAIEmbeddings
+
+    load_dotenv()
+    vector_store = load_faiss(
+        f"./.cache/site_indexes/{args.url.replace('/', '')}", OpenAIEmbeddings()
+    )
+    reranker = LexicalReranker(top_n=args.top_n)
+
+    with open(args.eval, encoding="utf-8") as f:
+        examples = [json.loads(line) for line in f if line.strip()]
+    # Pages that moved or left the sitemap can never be hit; they are
+    # reported and left out instead of silently lowering both hit rates.
+    indexed = set(build_manifest(vector_store))
+    missing = sorted({example["source"] for example in examples} - indexed)
+    if missing:
+        print(f"인덱스에 없는 출처 {len(missing)}개는 제외합니다:")
+        for source in missing:
+            print(f"  {source}")
+        examples = [example for example in examples if example["source"] in indexed]
+
+    baseline_hits, reranked_hits = 0, 0
+    for example in examples:
+        candidates = vector_store.similarity_search(example["question"], k=args.retrieve_k)
+        baseline_hits += hit(candidates[: args.baseline_k], example["source"])
+        reranked = reranker.rerank(example["question"], candidates)
+        reranked_hits += hit(reranked, example["source"])
+
+    total = max(len(examples), 1)
+    print("stage                  | hit rate | LLM calls/question")
+    print(f"vector top-{args.baseline_k:<10} | {baseline_hits / total:>8.0%} | {args.baseline_k}")
+    print(
+        f"rerank {args.retrieve_k}->{args.top_n:<10} | {reranked_hits / total:>8.0%} | {args.top_n}"
+    )
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cachetools import LRUCache
+
+from utils.sqlite import connect
+
+DEFAULT_FAVORITES_PATH = "./.cache/favorites.sqlite3"
+
+
+class MemoryFavoritesStore:
+    def __init__(self, max_items=100):
+        self.max_items = max_items
+        self.db = {}
+
+    async def add(self, token, name):
+        favorites = self.db.setdefault(token, [])
+        if name in favorites:
+            favorites.remove(name)
+        favorites.append(name)
+        del favorites[: -self.max_items]
+
+    async def get(self, token):
+        return list(self.db.get(token, []))
+
+    async def close(self):
+        pass
+
+
+class SQLiteFavoritesStore:
+    def __init__(self, path=DEFAULT_FAVORITES_PATH, max_items=100, batch_window=0.002):
+        self.max_items = max_items
+        self.batch_window = batch_window
+        self.writer = connect(path)
+        self.writer.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS favorites (
+                token TEXT NOT NULL,
+                name TEXT NOT NULL,
+                added_at REAL NOT NULL,
+                PRIMARY KEY (token, name)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS favorites_token_added_at
+                ON favorites (token, added_at);
+            """
+        )
+        self.reader = connect(path)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.cache = LRUCache(maxsize=10_000)
+        self.data_version = None
+        self.pending = []
+        self.flush_task = None
+
+    async def add(self, token, name):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((token, name, time.time(), future))
+        if self.flush_task is None:
+            self.flush_task = asyncio.create_task(self._flush())
+        await future
+
+    async def get(self, token):
+        # data_version changes whenever another connection (our writer or
+        # another worker process) commits, so the cache never serves stale rows.
+        data_version = self.reader.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self.data_version:
+            self.cache.clear()
+            self.data_version = data_version
+        if token not in self.cache:
+            rows = self.reader.execute(
+                "SELECT name FROM favorites WHERE token = ? ORDER BY added_at",
+                (token,),
+            ).fetchall()
+            self.cache[token] = [name for name, in rows]
+        return list(self.cache[token])
+
+    async def close(self):
+        if self.flush_task:
+            await self.flush_task
+        self.executor.shutdown()
+        self.writer.close()
+        self.reader.close()
+
+    async def _flush(self):
+        await asyncio.sleep(self.batch_window)
+        batch, self.pending = self.pending, []
+        self.flush_task = None
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self.executor, self._write, [row[:3] for row in batch]
+            )
+        except Exception as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_result(None)
+
+    def _write(self, rows):
+        with self.writer:
+            self.writer.executemany(
+                "INSERT OR REPLACE INTO favorites (token, name, added_at) VALUES (?, ?, ?)",
+                rows,
+            )
+            self.writer.executemany(
+                """
+                DELETE FROM favorites WHERE token = ? AND name NOT IN (
+                    SELECT name FROM favorites WHERE token = ?
+                    ORDER BY added_at DESC LIMIT ?
+                )
+                """,
+                [(token, token, self.max_items) for token in {row[0] for row in rows}],
+            )
+
+
+def create_favorites_store():
+    if os.getenv("FAVORITES_BACKEND", "sqlite") == "memory":
+        return MemoryFavoritesStore()
+    return SQLiteFavoritesStore(os.getenv("FAVORITES_PATH", DEFAULT_FAVORITES_PATH))
@@ -0,0 +1,183 @@
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import numpy as np
+import tiktoken
+
+from chef.recipe_index import (
+    DEFAULT_INDEX_PATH,
+    DOCUMENTS_FILE,
+    VECTORS_FILE,
+    normalize,
+    read_recipes,
+    recipe_to_text,
+)
+
+DEFAULT_WORK_PATH = "./.cache/recipe_ingest"
+CHECKPOINT_FILE = "checkpoint.json"
+
+
+def stream_recipes(csv_path, start=0):
+    for row_number, row in enumerate(read_recipes(csv_path)):
+        if row_number >= start:
+            yield recipe_to_text(row)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def shard_path(work_path, start, suffix):
+    return os.path.join(work_path, f"{start:08d}{suffix}")
+
+
+class Checkpoint:
+    def __init__(self, work_path, batch_size):
+        self.file = os.path.join(work_path, CHECKPOINT_FILE)
+        self.batch_size = batch_size
+        self.rows = 0
+        if os.path.exists(self.file):
+            with open(self.file) as f:
+                state = json.load(f)
+            if state["batch_size"] != batch_size:
+                raise ValueError(
+                    f"체크포인트의 batch_size({state['batch_size']})와 다릅니다: {batch_size}"
+                )
+            self.rows = state["rows"]
+
+    def advance(self, rows):
+        self.rows += rows
+        tmp_file = f"{self.file}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump({"rows": self.rows, "batch_size": self.batch_size}, f)
+        os.replace(tmp_file, self.file)
+
+
+class IngestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.rows = 0
+        self.tokens = 0
+
+    def update(self, rows, tokens):
+        self.rows += rows
+        self.tokens += tokens
+
+    def report(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return (
+            f"{self.rows} rows | {self.rows / elapsed:.1f} rows/s"
+            f" | {self.tokens / elapsed:.0f} tokens/s"
+        )
+
+
+def ingest(
+    csv_path,
+    embeddings,
+    work_path=DEFAULT_WORK_PATH,
+    batch_size=100,
+    max_concurrency=4,
+    on_batch=None,
+):
+    os.makedirs(work_path, exist_ok=True)
+    checkpoint = Checkpoint(work_path, batch_size)
+    encoding = tiktoken.get_encoding("cl100k_base")
+    stats = IngestStats()
+
+    def commit(texts, future):
+        vectors = normalize(future.result())
+        start = checkpoint.rows
+        np.save(shard_path(work_path, start, ".npy"), vectors)
+        with open(shard_path(work_path, start, ".jsonl"), "w", encoding="utf-8") as f:
+            for text in texts:
+                f.write(json.dumps(text, ensure_ascii=False) + "\n")
+        if on_batch:
+            on_batch(start, texts, vectors)
+        checkpoint.advance(len(texts))
+        stats.update(len(texts), sum(map(len, encoding.encode_batch(texts))))
+        print(stats.report())
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        pending = deque()
+        for texts in batched(stream_recipes(csv_path, checkpoint.rows), batch_size):
+            pending.append((texts, executor.submit(embeddings.embed_documents, texts)))
+            if len(pending) >= max_concurrency:
+                commit(*pending.popleft())
+        while pending:
+            commit(*pending.popleft())
+    return checkpoint.rows
+
+
+def assemble_local_index(work_path, index_path, batch_size):
+    total = Checkpoint(work_path, batch_size).rows
+    os.makedirs(index_path, exist_ok=True)
+    vectors = None
+    with open(os.path.join(index_path, DOCUMENTS_FILE), "w", encoding="utf-8") as docs:
+        for start in range(0, total, batch_size):
+            shard = np.load(shard_path(work_path, start, ".npy"))
+            if vectors is None:
+                vectors = np.lib.format.open_memmap(
+                    os.path.join(index_path, VECTORS_FILE),
+                    mode="w+",
+                    dtype=np.float32,
+                    shape=(total, shard.shape[1]),
+                )
+            vectors[start : start + len(shard)] = shard
+            with open(shard_path(work_path, start, ".jsonl"), encoding="utf-8") as f:
+                docs.writelines(f)
+    if vectors is not None:
+        vectors.flush()
+
+
+def pinecone_upsert(index):
+    def upsert(start, texts, vectors):
+        index.upsert(
+            vectors=[
+                (str(start + i), vector.tolist(), {"text": text})
+                for i, (text, vector) in enumerate(zip(texts, vectors))
+            ]
+        )
+
+    return upsert
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from langchain.embeddings import OpenAIEmbeddings
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="recipes.csv를 임베딩해서 레시피 인덱스를 만듭니다.")
+    parser.add_argument("--csv", default="recipes.csv")
+    parser.add_argument("--target", choices=["local", "pinecone"], default="local")
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_PATH)
+    parser.add_argument("--out", default=DEFAULT_INDEX_PATH)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    on_batch = None
+    if args.target == "pinecone":
+        from pinecone import Pinecone
+
+        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+        on_batch = pinecone_upsert(pc.Index("recipes"))
+
+    rows = ingest(
+        args.csv,
+        OpenAIEmbeddings(),
+        work_path=args.work_dir,
+        batch_size=args.batch_size,
+        max_concurrency=args.concurrency,
+        on_batch=on_batch,
+    )
+    if args.target == "local":
+        assemble_local_index(args.work_dir, args.out, args.batch_size)
+    print(f"{rows}개의 레시피를 저장했습니다.")
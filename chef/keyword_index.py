@@ -0,0 +1,83 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+from langchain.schema import Document
+
+from chef.recipe_index import read_recipes, recipe_to_text
+
+TOKEN_PATTERN = re.compile(r"[a-z]+")
+STOPWORDS = {
+    "a", "and", "of", "or", "the", "to", "for", "in", "with", "ingredients",
+    "g", "kg", "ml", "l", "tsp", "tbsp", "cup", "cups", "oz", "lb", "x",
+    "large", "small", "medium", "chopped", "diced", "sliced", "finely", "optional",
+}
+
+
+def tokenize(text):
+    return [
+        token
+        for token in TOKEN_PATTERN.findall(text.lower())
+        if token not in STOPWORDS and len(token) > 1
+    ]
+
+
+class KeywordRecipeIndex:
+    def __init__(self, texts, fields, k1=1.2, b=0.75):
+        self.texts = texts
+        self.k1 = k1
+        self.b = b
+        postings = defaultdict(list)
+        lengths = []
+        for doc_id, field in enumerate(fields):
+            counts = Counter(tokenize(field))
+            lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                postings[term].append((doc_id, count))
+        self.lengths = np.array(lengths, dtype=np.float32)
+        self.average_length = max(float(self.lengths.mean()), 1.0) if lengths else 1.0
+        self.postings = {}
+        for term, entries in postings.items():
+            doc_ids, counts = zip(*entries)
+            idf = math.log(1 + (len(texts) - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            self.postings[term] = (
+                np.array(doc_ids),
+                np.array(counts, dtype=np.float32),
+                idf,
+            )
+
+    @classmethod
+    def from_csv(cls, csv_path, field="ingredients"):
+        texts, fields = [], []
+        for row in read_recipes(csv_path):
+            texts.append(recipe_to_text(row))
+            fields.append(row[field])
+        return cls(texts, fields)
+
+    def search(self, query, k=4):
+        scores = np.zeros(len(self.texts), dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            doc_ids, counts, idf = self.postings[term]
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_ids] / self.average_length)
+            scores[doc_ids] += idf * counts * (self.k1 + 1) / (counts + norm)
+        matched = np.flatnonzero(scores)
+        k = min(k, len(matched))
+        if k == 0:
+            return []
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [Document(page_content=self.texts[i]) for i in top]
+
+
+def reciprocal_rank_fusion(rankings, k=4, c=60):
+    scores = defaultdict(float)
+    documents = {}
+    for ranking in rankings:
+        for rank, document in enumerate(ranking):
+            scores[document.page_content] += 1 / (c + rank + 1)
+            documents.setdefault(document.page_content, document)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [documents[text] for text in ranked[:k]]
@@ -0,0 +1,171 @@
+import asyncio
+import threading
+from collections import namedtuple
+
+import openai
+from cachetools import TTLCache
+
+from chef.keyword_index import reciprocal_rank_fusion
+
+CachedQuery = namedtuple("CachedQuery", ["vector", "documents"])
+
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+class QueryCache:
+    def __init__(self, maxsize=1024, ttl=60 * 60):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def set(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+
+    def stats(self):
+        with self.lock:
+            return {
+                "size": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class EmbeddingBatcher:
+    def __init__(self, embeddings, upstream, window=0.005, max_batch=64):
+        self.embeddings = embeddings
+        self.upstream = upstream
+        self.window = window
+        self.max_batch = max_batch
+        self.queue = None
+        self.task = None
+        # The event loop only holds weak references to tasks, so in-flight
+        # batches are kept here until they finish.
+        self.batch_tasks = set()
+        self.batches = 0
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        tasks = [task for task in (self.task, *self.batch_tasks) if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        while self.queue and not self.queue.empty():
+            _, future = self.queue.get_nowait()
+            future.cancel()
+
+    async def embed(self, text):
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((text, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        # openai 0.28 picks its aiohttp session from this context variable,
+        # and every batch task below inherits it.
+        openai.aiosession.set(self.upstream.session)
+        while True:
+            batch = await self._collect()
+            task = asyncio.create_task(self._embed(batch))
+            self.batch_tasks.add(task)
+            task.add_done_callback(self.batch_tasks.discard)
+
+    async def _embed(self, batch):
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            async with self.upstream.semaphore:
+                vectors = await self.embeddings.aembed_documents(texts)
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches += 1
+        vectors = dict(zip(texts, vectors))
+        for text, future in batch:
+            if not future.done():
+                future.set_result(vectors[text])
+
+
+class CachedRecipeSearch:
+    def __init__(
+        self,
+        vector_store,
+        embeddings,
+        upstream,
+        keyword_index=None,
+        k=4,
+        candidates=20,
+        maxsize=1024,
+        ttl=60 * 60,
+    ):
+        self.vector_store = vector_store
+        self.keyword_index = keyword_index
+        self.k = k
+        self.candidates = candidates
+        self.cache = QueryCache(maxsize=maxsize, ttl=ttl)
+        self.batcher = EmbeddingBatcher(embeddings, upstream)
+
+    def start(self):
+        self.batcher.start()
+
+    async def stop(self):
+        await self.batcher.stop()
+
+    async def search(self, query, mode="vector"):
+        key = normalize_query(query)
+        if mode == "keyword":
+            return self.keyword_index.search(key, k=self.k)
+        documents = await self._vector_search(key)
+        if mode == "hybrid":
+            return reciprocal_rank_fusion(
+                [documents, self.keyword_index.search(key, k=self.candidates)],
+                k=self.k,
+            )
+        return documents[: self.k]
+
+    async def _vector_search(self, key):
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached.documents
+        vector = await self.batcher.embed(key)
+        documents = await self.vector_store.asimilarity_search_by_vector(
+            vector, k=self.candidates
+        )
+        self.cache.set(key, CachedQuery(vector, documents))
+        return documents
+
+    def stats(self):
+        return {**self.cache.stats(), "embedding_batches": self.batcher.batches}
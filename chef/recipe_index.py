@@ -0,0 +1,81 @@
+import csv
+import json
+import os
+import sys
+
+import numpy as np
+from langchain.schema import Document
+
+csv.field_size_limit(sys.maxsize)
+
+DEFAULT_INDEX_PATH = "./.cache/recipe_index"
+VECTORS_FILE = "vectors.npy"
+DOCUMENTS_FILE = "documents.jsonl"
+
+
+def recipe_to_text(row):
+    return "\n".join(
+        f"{key.strip()}: {value.strip()}" for key, value in row.items() if key.strip()
+    )
+
+
+def read_recipes(csv_path):
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield row
+
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class LocalRecipeIndex:
+    def __init__(self, path, embeddings):
+        self.embeddings = embeddings
+        self.vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+        with open(os.path.join(path, DOCUMENTS_FILE), encoding="utf-8") as f:
+            self.texts = [json.loads(line) for line in f]
+
+    def similarity_search_by_vector(self, embedding, k=4):
+        scores = self.vectors @ normalize(embedding)
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [Document(page_content=self.texts[i]) for i in top]
+
+    def similarity_search(self, query, k=4):
+        return self.similarity_search_by_vector(self.embeddings.embed_query(query), k)
+
+    async def asimilarity_search_by_vector(self, embedding, k=4):
+        return self.similarity_search_by_vector(embedding, k)
+
+
+class PineconeRecipeIndex:
+    def __init__(self, host, api_key, upstream, text_key="text"):
+        self.url = f"https://{host}/query"
+        self.headers = {"Api-Key": api_key}
+        self.upstream = upstream
+        self.text_key = text_key
+
+    async def asimilarity_search_by_vector(self, embedding, k=4):
+        async with self.upstream.semaphore:
+            async with self.upstream.session.post(
+                self.url,
+                headers=self.headers,
+                json={
+                    "vector": list(map(float, embedding)),
+                    "topK": k,
+                    "includeMetadata": True,
+                },
+            ) as response:
+                response.raise_for_status()
+                result = await response.json()
+        return [
+            Document(page_content=match["metadata"][self.text_key])
+            for match in result["matches"]
+        ]
+
@@ -0,0 +1,20 @@
+import asyncio
+
+import aiohttp
+
+
+class Upstream:
+    def __init__(self, max_concurrency=32):
+        self.max_concurrency = max_concurrency
+        self.session = None
+        self.semaphore = None
+
+    async def start(self):
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency)
+        )
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def close(self):
+        if self.session:
+            await self.session.close()
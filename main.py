@@ -1,24 +1,48 @@
 import os
+from enum import Enum
 from pinecone import Pinecone
 from langchain.embeddings import OpenAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
 from dotenv import load_dotenv
-from fastapi import FastAPI, Form, Request
+from fastapi import FastAPI, Form, Query, Request
 from fastapi.responses import HTMLResponse
 from pydantic import BaseModel, Field
+from chef.recipe_index import (
+    DEFAULT_INDEX_PATH,
+    LocalRecipeIndex,
+    PineconeRecipeIndex,
+)
+from chef.query_cache import CachedRecipeSearch
+from chef.keyword_index import KeywordRecipeIndex
+from chef.upstream import Upstream
+from chef.favorites import create_favorites_store
 
 load_dotenv()
 
-pc = Pinecone(
-    api_key=os.getenv("PINECONE_API_KEY"),
-    environment="gcp-starter",
-)
-
 embeddings = OpenAIEmbeddings()
 
-vector_store = PineconeVectorStore.from_existing_index(
-    "recipes",
+upstream = Upstream(max_concurrency=int(os.getenv("UPSTREAM_CONCURRENCY", "32")))
+
+if os.getenv("RECIPE_INDEX", "pinecone") == "local":
+    vector_store = LocalRecipeIndex(
+        os.getenv("RECIPE_INDEX_PATH", DEFAULT_INDEX_PATH),
+        embeddings,
+    )
+else:
+    pc = Pinecone(
+        api_key=os.getenv("PINECONE_API_KEY"),
+        environment="gcp-starter",
+    )
+    vector_store = PineconeRecipeIndex(
+        pc.describe_index("recipes").host,
+        os.getenv("PINECONE_API_KEY"),
+        upstream,
+    )
+
+recipe_search = CachedRecipeSearch(
+    vector_store,
     embeddings,
+    upstream,
+    keyword_index=KeywordRecipeIndex.from_csv(os.getenv("RECIPES_CSV", "recipes.csv")),
 )
 
 app = FastAPI(
@@ -31,13 +55,32 @@ app = FastAPI(
     ],
 )
 
-user_token_db = {}
+favorites = create_favorites_store()
+
+
+@app.on_event("startup")
+async def startup():
+    await upstream.start()
+    recipe_search.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await recipe_search.stop()
+    await upstream.close()
+    await favorites.close()
 
 
 class Document(BaseModel):
     page_content: str = Field(description="레시피에 대한 자세한 설명")
 
 
+class SearchMode(str, Enum):
+    vector = "vector"
+    hybrid = "hybrid"
+    keyword = "keyword"
+
+
 @app.get(
     "/recipes",
     summary="레시피 목록을 반환합니다.",
@@ -45,21 +88,30 @@ class Document(BaseModel):
     response_description="레시피와 준비 설명서를 포함하는 문서 객체",
     response_model=list[Document],
 )
-def get_recipe(ingredient: str):
-    docs = vector_store.similarity_search(ingredient)
+async def get_recipe(
+    ingredient: str,
+    mode: SearchMode = Query(
+        SearchMode.vector,
+        description="vector는 의미 검색, keyword는 재료 이름 검색(임베딩 없음), hybrid는 둘을 합친 검색입니다.",
+    ),
+):
+    docs = await recipe_search.search(ingredient, mode)
     return docs
 
 
+@app.get("/recipes/stats", include_in_schema=False)
+async def get_recipe_stats():
+    return recipe_search.stats()
+
+
 @app.get(
     "/add_favorite",
     summary="좋아하는 음식 목록에 음식을 추가합니다.",
     description="음식 이름을 받고 그 음식을 좋아하는 음식 리스트에 저장합니다.",
 )
-def add_favorite_food(request: Request, name: str):
+async def add_favorite_food(request: Request, name: str):
     token = request.headers["authorization"].split()[1]
-    if token not in user_token_db:
-        user_token_db[token] = {"favorite_food_list": []}
-    user_token_db[token]["favorite_food_list"].append(name)
+    await favorites.add(token, name)
     return {"ok": True}
 
 
@@ -70,17 +122,13 @@ def add_favorite_food(request: Request, name: str):
     response_description="사용자의 좋아하는 음식 목록",
     response_model=list[str],
 )
-def get_favorite_food(request: Request):
+async def get_favorite_food(request: Request):
     token = request.headers["authorization"].split()[1]
-    if token not in user_token_db:
-        return []
-    else:
-        return user_token_db[token]["favorite_food_list"]
+    return await favorites.get(token)
 
 
 @app.get("/authorize", response_class=HTMLResponse, include_in_schema=False)
 def handle_authorize(client_id: str, redirect_uri: str, state: str):
-    user_token_db[client_id] = {"favorite_food_list": []}
     return f"""
         <html>
             <head>
@@ -1,16 +1,15 @@
 from operator import itemgetter
 import streamlit as st
-from langchain.storage import LocalFileStore
-from langchain.text_splitter import CharacterTextSplitter
-from langchain.vectorstores import FAISS
-from langchain.embeddings import OllamaEmbeddings, CacheBackedEmbeddings
-from langchain.document_loaders import UnstructuredFileLoader
+from langchain.embeddings import OllamaEmbeddings
 from langchain.prompts import ChatPromptTemplate
 from langchain.schema.runnable import RunnablePassthrough, RunnableLambda
 from langchain.chat_models.ollama import ChatOllama
 from langchain.callbacks.base import BaseCallbackHandler
 from langchain.prompts import MessagesPlaceholder
 from langchain.memory import ConversationSummaryBufferMemory
+from utils.documents import load_and_split_file
+from utils.stores import packed_cache_backed_embeddings
+from utils.vectorstores import load_or_build_faiss
 
 st.set_page_config(page_title="PrivateGPT", page_icon="⚙️")
 
@@ -49,22 +48,17 @@ def paint_history():
         send_message(message["message"], message["role"], save=False)
 
 
-@st.cache_data(show_spinner="Embedding..")
+@st.cache_resource(show_spinner="Embedding..")
 def embed_file(file):
-    file_content = file.read()
-    file_path = f"./.cache/private_files/{file.name}"
-    with open(file_path, "wb") as f:
-        f.write(file_content)
-    cache_dir = LocalFileStore(f"./.cache/private_embeddings/{file.name}")
-    splitter = CharacterTextSplitter.from_tiktoken_encoder(
-        separator="\n", chunk_size=600, chunk_overlap=100
-    )
-    loader = UnstructuredFileLoader(file_path)
-    docs = loader.load_and_split(text_splitter=splitter)
+    file_hash, docs = load_and_split_file(file)
     embeddings = OllamaEmbeddings(model="mistral:latest")
-    cached_embeddings = CacheBackedEmbeddings.from_bytes_store(embeddings, cache_dir)
+    cached_embeddings = packed_cache_backed_embeddings(
+        embeddings, "./.cache/private_embeddings.sqlite3"
+    )
 
-    vectorstore = FAISS.from_documents(docs, cached_embeddings)
+    vectorstore = load_or_build_faiss(
+        f"./.cache/private_indexes/{file_hash}", cached_embeddings, lambda: docs
+    )
 
     retriever = vectorstore.as_retriever()
 
@@ -1,12 +1,13 @@
 import streamlit as st
-import json
-from langchain.retrievers import WikipediaRetriever
-from langchain.text_splitter import CharacterTextSplitter
 from langchain.prompts import PromptTemplate
-from langchain.document_loaders import UnstructuredFileLoader
 from langchain.callbacks import StreamingStdOutCallbackHandler
 from langchain.chat_models.openai import ChatOpenAI
-import random
+from langchain.embeddings import OpenAIEmbeddings
+from utils.documents import load_and_split_file
+from utils.json_stream import ArrayItemParser
+from utils.quiz import QuestionBank, content_hash
+from utils.stores import packed_cache_backed_embeddings
+from utils.wiki_cache import WikipediaSearch
 
 st.set_page_config(
     page_title="QuizGPT",
@@ -15,6 +16,9 @@ st.set_page_config(
 
 st.title("QuizGPT")
 
+QUIZ_SIZE = 10
+SAMPLED_CHUNKS = 8
+
 function = {
     "name": "get_questions",
     "description": "질문과 여러개의 보기로 이루어져 있는 questions array를 필요로 하는 function입니다.",
@@ -68,7 +72,7 @@ llm = ChatOpenAI(
 prompt = PromptTemplate.from_template(
     """
 당신은 주어진 문서들을 기반으로 학생들의 지식 수준을 시험하는 문제를 출제하는 프로 출제자입니다.
-주어질 Context에 등장하는 정보들을 바탕으로 10개의 문제를 출제하세요.
+주어질 Context에 등장하는 정보들을 바탕으로 {count}개의 문제를 출제하세요.
 모든 문제는 총 4개의 보기가 있으며 그 중 한개만 정답입니다.
 모든 문제는 짧고 유니크하게 출제하세요.
 
@@ -79,38 +83,70 @@ prompt = PromptTemplate.from_template(
 )
 
 
-def foramt_document(docs):
-    return "\n\n".join(document.page_content for document in docs)
+@st.cache_resource
+def get_wikipedia():
+    return WikipediaSearch(lang="ko")
 
 
 @st.cache_data(show_spinner='"위키피디아"에 검색 중..')
 def get_from_wikipedia(topic):
-    retriever = WikipediaRetriever(lang="ko")
-    return retriever.get_relevant_documents(topic)
+    return get_wikipedia().get_relevant_documents(topic)
+
+
+def generate_chunk_questions(doc, count):
+    # Questions are parsed out of the streamed function-call arguments and
+    # yielded as soon as each one's closing brace arrives.
+    parser = ArrayItemParser()
+    chain = prompt | llm
+    for chunk in chain.stream(
+        {"context": doc.page_content, "count": count}
+    ):
+        function_call = chunk.additional_kwargs.get("function_call", {})
+        yield from parser.feed(function_call.get("arguments", ""))
 
 
-@st.cache_data(show_spinner="문제 생성 중..")
-def generate_questions(_docs, topic):
-    chain = {"context": foramt_document} | prompt | llm
-    response = chain.invoke(_docs)
-    arguments = json.loads(response.additional_kwargs["function_call"]["arguments"])
-    for index in range(len(arguments["questions"])):
-        random.shuffle(arguments["questions"][index]["answers"])
-    return arguments
+def build_question_bank(bank, docs):
+    embeddings = packed_cache_backed_embeddings(
+        OpenAIEmbeddings(), "./.cache/quiz_embeddings.sqlite3"
+    )
+    return bank.build(
+        docs,
+        generate_chunk_questions,
+        embeddings,
+        size=QUIZ_SIZE,
+        chunks=SAMPLED_CHUNKS,
+    )
+
+
+def paint_question(idx, question):
+    value = st.radio(
+        f"{idx+1}: {question['question']}",
+        [
+            f"{index+1}: {answer['answer']}"
+            for index, answer in enumerate(question["answers"])
+        ],
+        index=None,
+    )
+    isCorrect = False
+    if value:
+        isCorrect = {"answer": value[3:], "correct": True} in question["answers"]
+    if isCorrect:
+        st.success("✅ 정답입니다!")
+    elif value:
+        if show_answer:
+            for index, answer in enumerate(question["answers"]):
+                if "correct" in answer and answer["correct"]:
+                    answer_number = index + 1
+                    break
+            st.error(f"❌ 오답입니다. (정답: {answer_number}번)")
+        else:
+            st.error("❌ 오답입니다.")
+    st.divider()
 
 
 @st.cache_data(show_spinner="로딩 중..")
 def split_file(file):
-    file_content = file.read()
-    file_path = f"./.cache/quiz_files/{file.name}"
-    with open(file_path, "wb") as f:
-        f.write(file_content)
-    splitter = CharacterTextSplitter.from_tiktoken_encoder(
-        separator="\n", chunk_size=600, chunk_overlap=100
-    )
-    loader = UnstructuredFileLoader(file_path)
-    docs = loader.load_and_split(text_splitter=splitter)
-    return docs
+    return load_and_split_file(file)
 
 
 with st.sidebar:
@@ -126,7 +162,7 @@ with st.sidebar:
     if choice == "파일":
         file = st.file_uploader("문서를 업로드해 주세요.", type=["pdf", "docx", "txt"])
         if file:
-            docs = split_file(file)
+            file_hash, docs = split_file(file)
     else:
         topic = st.text_input(
             "위키피디아에서 검색", placeholder="검색할 내용을 입력해 주세요."
@@ -147,32 +183,27 @@ QuizGPT에 오신 것을 환영합니다.
 """
     )
 else:
-    response = generate_questions(docs, topic if topic else file.name)
+    bank_key = file_hash if choice == "파일" else content_hash(docs)
+    bank = QuestionBank(bank_key)
+    if st.session_state.get("quiz_key") != bank_key:
+        st.session_state["quiz_key"] = bank_key
+        st.session_state["quiz_round"] = 0
+    if len(bank.questions) > QUIZ_SIZE and st.button("다른 문제 풀기"):
+        st.session_state["quiz_round"] += 1
     with st.form("questions_form"):
-        for idx, question in enumerate(response["questions"]):
-            value = st.radio(
-                f"{idx+1}: {question['question']}",
-                [
-                    f"{index+1}: {answer['answer']}"
-                    for index, answer in enumerate(question["answers"])
-                ],
-                index=None,
+        if bank:
+            quiz_round = st.session_state["quiz_round"]
+            response = bank.draw(
+                QUIZ_SIZE, seed=f"{bank_key}-{quiz_round}" if quiz_round else None
             )
-            isCorrect = False
-            if value:
-                isCorrect = {"answer": value[3:], "correct": True} in question[
-                    "answers"
-                ]
-            if isCorrect:
-                st.success("✅ 정답입니다!")
-            elif value:
-                if show_answer:
-                    for index, answer in enumerate(question["answers"]):
-                        if "correct" in answer and answer["correct"]:
-                            answer_number = index + 1
-                            break
-                    st.error(f"❌ 오답입니다. (정답: {answer_number}번)")
-                else:
-                    st.error("❌ 오답입니다.")
-            st.divider()
+            for idx, question in enumerate(response["questions"]):
+                paint_question(idx, question)
+        else:
+            # First visit: questions are painted while the bank is still
+            # being generated; the bank's first QUIZ_SIZE questions are the
+            # ones shown here, so reruns keep the same form.
+            with st.spinner("문제 생성 중.."):
+                for idx, question in enumerate(build_question_bank(bank, docs)):
+                    if idx < QUIZ_SIZE:
+                        paint_question(idx, question)
         button = st.form_submit_button()
@@ -1,17 +1,34 @@
-from langchain.document_loaders import SitemapLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.vectorstores.faiss import FAISS
-from langchain.embeddings import OpenAIEmbeddings, CacheBackedEmbeddings
-from langchain.storage import LocalFileStore
+from langchain.embeddings import OpenAIEmbeddings
 from langchain.schema.runnable import RunnablePassthrough, RunnableLambda
 from langchain.chat_models import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from langchain.memory import ConversationSummaryBufferMemory
 from langchain.callbacks.base import BaseCallbackHandler
+from langchain.schema import Document
 from bs4 import BeautifulSoup
-import json
+from utils.stores import packed_cache_backed_embeddings
+from utils.vectorstores import load_faiss, load_or_build_faiss, save_faiss
+from utils.crawler import SitemapCrawler
+from utils.site_index import refresh_site
+from utils.semantic_cache import SemanticCache
+from utils.rerank import LexicalReranker
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
+import re
+import time
 import streamlit as st
 
+RETRIEVE_K = 20
+RERANK_TOP_N = 3
+MAP_CONCURRENCY = 4
+MAP_TIMEOUT = 20
+HIGH_SCORE = 4
+ENOUGH_HIGH_SCORES = 2
+# Lowest cosine similarity served from the answer cache; re-tune with
+# benchmarks/semantic_cache_threshold.py.
+ANSWER_CACHE_THRESHOLD = 0.95
+
 
 class ChatCallbackHandler(BaseCallbackHandler):
     def __init__(self, *args, **kwargs):
@@ -28,27 +45,9 @@ class ChatCallbackHandler(BaseCallbackHandler):
         self.message_box.markdown(self.message)
 
 
-function = {
-    "name": "answer_question",
-    "description": "이 function은 효율적으로 산출된 답변을 받는 function입니다.",
-    "parameters": {
-        "type": "object",
-        "properties": {
-            "isNew": {
-                "type": "boolean",
-                "description": "결과를 새로 만들지 안 만들지 정하는 property임. (과거 기록에 이미 답변된 정보가 있다면 새로 만들지 않으니 False입니다.)",
-            },
-            "answer": {
-                "type": "string",
-                "description": "과거 대화 기록에 답변된 정보가 있을 때 그 정보를 포함하는 property입니다. (만약 답변된 기록이 없다면 이 property는 존재하지 않습니다.)",
-            },
-        },
-    },
-    "required": ["isNew"],
-}
-
 llm = ChatOpenAI(
     temperature=0.1,
+    request_timeout=MAP_TIMEOUT,
 )
 
 streaming_llm = ChatOpenAI(
@@ -57,15 +56,6 @@ streaming_llm = ChatOpenAI(
     callbacks=[ChatCallbackHandler()],
 )
 
-function_llm = ChatOpenAI(
-    temperature=0.1,
-).bind(
-    functions=[
-        function,
-    ],
-    function_call={"name": "answer_question"},
-)
-
 if "memory" not in st.session_state:
     st.session_state["memory"] = ConversationSummaryBufferMemory(
         llm=llm, max_token_limit=1000
@@ -130,128 +120,6 @@ choose_prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-cache_prompt = ChatPromptTemplate.from_template(
-    """
-당신은 과거 기록을 보고 새로운 질문과 비슷한 의미를 지닌 기록을 찾아서 이미 ai가 답한 데이터를 반환해서 효율적으로 일하게 해주는 비서입니다.
-따라서 당신은 질문에 대한 답변을 당신이 생성해서는 안되며 기록에서 찾아서 반환해야 합니다. 만약에 존재하지 않다면 반환하지 않습니다.
-    
-주어진 과거 대화 기록에서 새로운 질문과 비슷한 의미의 질문을 했던 기록을 찾고 그 질문이 ai에게 답변이 완료됐는지 확인하세요.
-만약 ai에게 답변이 완료되었고 비슷한 의미의 질문이 존재한다면 isNew를 False로 설정하고(새롭게 생성하지 않고 대화 기록에서 가져오기 때문에 New가 아님) answer를 그 완료된 답변으로 설정하세요.
-만약 ai에게 답변이 완료되지 않았거나 비슷한 질문을 했던 기록이 없다면, isNew를 True로 설정하고 answer를 작성하지 마세요.
-주의 해야 할 점은 대화 기록의 마지막에 새로운 질문이 저장되어 있습니다. 그 질문은 ai에게 답변되지 않았기 때문에 사용하지 마세요.
-
-자 명심하세요, 과거 대화 기록에 비슷한 의미의 질문이 이미 답변 된 정보가 있다면 isNew는 False가 되며 그 ai에게 이미 답변된 답변을 수정하지 말고 그대로 answer에 넣으세요.
-만약 비슷한 의미의 질문이 답변되지 않았다면 isNew는 True가 되며 answer는 존재하지 않습니다.
-
-문장 구조가 비슷해도 가리키는 대상이 다르다면 다른 질문입니다,
-반대로 문장 구조가 다르더라도 가리키는 대상이 같고 의미가 같은 경우가 있으니 모든 것을 고려해주세요.
-
-짧은 예시: 4B 연필은 진한가요?와 2B 연필은 진한가요? 은 다른 질문이니 isNew는 True이다, 고라니의 뿔은 무슨 색인가요?와 고라니가 가지고 있는 뿔의 색깔을 알려주세요. 는 같은 질문이니 isNew가 False이다.
-
---------예시--------
-1번 예시:
-
-예시 과거 대화 기록:
-human: 하늘은 무슨 색인가요?
-ai: 하늘색입니다. (출처: https://example.com/source)
-human: 물티슈는 무엇으로 만들어지나요?
-
-예시 질문:
-물티슈는 무엇으로 만들어지나요?
-
-예시 결과:
-isNew = True
-
-||||||||||||||
-
-2번 예시:
-
-예시 과거 대화 기록:
-human: 연필은 무엇을 하는데 사용되나요?
-
-예시 질문:
-연필은 무엇을 하는데 사용되나요?
-
-예시 결과:
-isNew = True
-answer =
-
-||||||||||||||
-
-3번 예시:
-
-예시 과거 대화 기록:
-human: 빛의 삼원색은 무엇인가요?
-ai: 빨간색, 초록색, 파란색입니다. (출처: https://example.com/source)
-human: 안녕하세요 저는 Gorani인데요, 빛의 삼원색을 알려주세요.
-
-예시 질문:
-안녕하세요 저는 Gorani인데요, 빛의 삼원색을 알려주세요.
-
-예시 결과:
-isNew = False
-answer = 빨간색, 초록색, 파란색입니다. (출처: https://example.com/source)
-
-||||||||||||||
-
-3번 예시:
-
-예시 과거 대화 기록:
-human: 바다는 무엇으로 이루어져 있는지 궁금해요.
-ai: 바다는 대부분 물로 이루어져 있습니다. (출처: https://example.com/source)
-human: 안녕하세요 반갑습니다! 바다는 무엇으로 이루어져 있나요?
-
-예시 질문:
-안녕하세요 반갑습니다! 바다는 무엇으로 이루어져 있나요?
-
-예시 결과:
-isNew = False
-answer = 바다는 대부분 물로 이루어져 있습니다. (출처: https://example.com/source)
-
-||||||||||||||
-
-4번 예시:
-
-예시 과거 대화 기록:
-human: 일기를 쓸 때 어떤 걸 쓰면 좋을까?
-ai: 오늘의 날씨와 있었던 일, 느낀 점을 쓰면 좋습니다. (출처: https://example.com/source)
-human: 일기장을 살 때 어떤 걸 사면 좋을까?
-
-예시 질문:
-일기장을 살 때 어떤 걸 사면 좋을까?
-
-예시 결과:
-isNew = True
-answer =
-
-||||||||||||||
-
-5번 예시:
-
-예시 과거 대화 기록:
-human: 고라니는 뿔이 몇개 달려 있어?
-ai: 암컷은 안 달려 있고 수컷은 2개 달려 있습니다.. (출처: https://example.com/source)
-human: 유니콘은 뿔이 몇개 달려 있어?
-
-예시 질문:
-유니콘은 뿔이 몇개 달려 있어?
-
-예시 결과:
-isNew = True
-answer =
---------------------
-
-이제 당신 차례입니다!
-
-실제 과거 대화 기록:
-{history}
-
-실제 질문:
-{question}
-"""
-)
-
-
 def paint_history():
     for message in st.session_state["messages"]:
         send_message(message["message"], message["role"], save=False)
@@ -272,28 +140,69 @@ def send_message(message, role, save=True):
         save_message(message, role)
 
 
+reranker = LexicalReranker(top_n=RERANK_TOP_N)
+
+
+def retrieve_docs(query):
+    return reranker.rerank(query, retriever.invoke(query))
+
+
+def parse_score(answer):
+    match = re.search(r"(?:점수|스코어)\s*:\s*(\d)", answer)
+    return int(match.group(1)) if match else 0
+
+
 def get_answers(inputs):
     with st.spinner("답변 생성 중.."):
         docs = inputs["docs"]
         question = inputs["question"]
         memory = inputs["memory"]
         answers_chain = answers_prompt | llm
+        executor = ThreadPoolExecutor(max_workers=MAP_CONCURRENCY)
+        futures = {
+            executor.submit(
+                answers_chain.invoke,
+                {
+                    "context": doc.page_content,
+                    "question": question,
+                    "memory": memory,
+                },
+            ): doc
+            for doc in docs
+        }
+        answers = []
+        errors = []
+        try:
+            for future in as_completed(futures, timeout=MAP_TIMEOUT):
+                if future.exception():
+                    errors.append(future.exception())
+                    continue
+                doc = futures[future]
+                answers.append(
+                    {
+                        "answer": future.result().content,
+                        "source": doc.metadata["source"],
+                        "date": doc.metadata["lastmod"],
+                    }
+                )
+                high_scores = sum(
+                    parse_score(answer["answer"]) >= HIGH_SCORE for answer in answers
+                )
+                if high_scores >= ENOUGH_HIGH_SCORES:
+                    break
+        except TimeoutError:
+            errors.append(TimeoutError(f"{MAP_TIMEOUT}초 안에 답변이 오지 않았습니다."))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        # Without a single answer the final step would make one up from no
+        # sources, so the first failure is shown to the user instead.
+        if not answers and errors:
+            raise errors[0]
+        answers.sort(key=lambda answer: parse_score(answer["answer"]), reverse=True)
         return {
             "question": question,
-            "answers": [
-                {
-                    "answer": answers_chain.invoke(
-                        {
-                            "context": doc.page_content,
-                            "question": question,
-                            "memory": memory,
-                        }
-                    ).content,
-                    "source": doc.metadata["source"],
-                    "date": doc.metadata["lastmod"],
-                }
-                for doc in docs
-            ],
+            "answers": answers,
+            "degraded": bool(errors),
         }
 
 
@@ -305,34 +214,39 @@ def choose_answer(inputs):
         f"{answer['answer']}\n출처: {answer['source']}\n날짜: {answer['date']}"
         for answer in answers
     )
-    return choose_chain.invoke(
-        {
-            "question": question,
-            "answers": condensed,
-        }
-    )
+    return {
+        "message": choose_chain.invoke(
+            {
+                "question": question,
+                "answers": condensed,
+            }
+        ),
+        "degraded": inputs["degraded"],
+    }
 
 
 def invoke_chain(query):
+    # The answer prompt resolves follow-ups ("더 자세히 설명해 줘") from the
+    # conversation memory, and the cache is shared by every session, so only
+    # questions asked with no history may be served from or stored in it.
+    if st.session_state["memory"].load_memory_variables({})["history"]:
+        result = chain.invoke(query)
+        save_memory(query, result["message"].content)
+        return
+    answer_cache = load_answer_cache(url)
+    started = time.perf_counter()
     with st.spinner("캐시 확인 중.."):
-        condensed = "\n".join(
-            f"{message['role']}: {message['message']}"
-            for message in st.session_state["messages"]
-        )
-        cache_chain = cache_prompt | function_llm
-        cache_result = json.loads(
-            cache_chain.invoke(
-                {
-                    "history": condensed,
-                    "question": query,
-                }
-            ).additional_kwargs["function_call"]["arguments"]
-        )
-    if cache_result["isNew"]:
+        cached, vector = answer_cache.lookup(query)
+    if cached is None:
         result = chain.invoke(query)
-        save_memory(query, result.content)
+        answer = result["message"].content
+        # An answer built while some map calls failed or timed out is shown
+        # once but not shared: the next asker gets a fresh, complete run.
+        if not result["degraded"]:
+            answer_cache.add(query, vector, answer, time.perf_counter() - started)
+        save_memory(query, answer)
     else:
-        result = cache_result["answer"]
+        result = cached["answer"]
         st.markdown(result)
         save_message(result, "ai")
         save_memory(query, result)
@@ -348,33 +262,79 @@ def parse_page(soup: BeautifulSoup):
     return str(soup.get_text()).replace("\n", " ").replace("\xa0", " ")
 
 
-@st.cache_data(show_spinner="임베딩 중..")
-def embed_file(url, _docs):
-    cache_dir = LocalFileStore(f"./.cache/site_embeddings/{url.replace('/', '')}")
+splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+    chunk_size=1000,
+    chunk_overlap=200,
+)
+
+
+def page_to_documents(entry, body):
+    page_content = parse_page(BeautifulSoup(body, "html.parser"))
+    doc = Document(
+        page_content=page_content,
+        metadata={
+            "source": entry["loc"],
+            "loc": entry["loc"],
+            "lastmod": entry.get("lastmod", ""),
+            "content_hash": hashlib.sha256(page_content.encode("utf-8")).hexdigest(),
+        },
+    )
+    return splitter.split_documents([doc])
+
+
+def crawl_website(url):
+    crawler = SitemapCrawler()
+    for entry, body in crawler.iter_pages(url):
+        yield from page_to_documents(entry, body)
+
+
+def get_index_path(url):
+    return f"./.cache/site_indexes/{url.replace('/', '')}"
+
+
+def get_embeddings():
     embeddings = OpenAIEmbeddings()
-    cached_embeddings = CacheBackedEmbeddings.from_bytes_store(embeddings, cache_dir)
-    vector_store = FAISS.from_documents(_docs, cached_embeddings)
-    retriever = vector_store.as_retriever()
-    print(retriever.invoke("플러터"))
+    return packed_cache_backed_embeddings(
+        embeddings, "./.cache/site_embeddings.sqlite3"
+    )
+
+
+@st.cache_resource(show_spinner="임베딩 중..")
+def embed_file(url, _load_docs):
+    vector_store = load_or_build_faiss(
+        get_index_path(url),
+        get_embeddings(),
+        _load_docs,
+    )
+    retriever = vector_store.as_retriever(search_kwargs={"k": RETRIEVE_K})
     return retriever
 
 
-@st.cache_data(show_spinner="웹 사이트 정보 불러오는 중..")
+@st.cache_resource(show_spinner="웹 사이트 정보 불러오는 중..")
 def load_website(url):
-    splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-        chunk_size=1000,
-        chunk_overlap=200,
-    )
-    loader = SitemapLoader(
-        url,
-        parsing_function=parse_page,
-    )
-    loader.requests_per_second = 1
-    docs = loader.load_and_split(text_splitter=splitter)
-    retriever = embed_file(url, docs)
+    retriever = embed_file(url, lambda: crawl_website(url))
     return retriever
 
 
+@st.cache_resource
+def load_answer_cache(url):
+    return SemanticCache(
+        f"./.cache/site_answers/{url.replace('/', '')}.sqlite3",
+        OpenAIEmbeddings(),
+        threshold=ANSWER_CACHE_THRESHOLD,
+    )
+
+
+def refresh_website(url):
+    vector_store = load_faiss(get_index_path(url), get_embeddings(), mmap=False)
+    result = refresh_site(vector_store, url, SitemapCrawler(), page_to_documents)
+    save_faiss(vector_store, get_index_path(url))
+    embed_file.clear()
+    load_website.clear()
+    load_answer_cache(url).clear()
+    return result
+
+
 st.set_page_config(page_title="SiteGPT", page_icon="🖥️")
 
 st.title("SiteGPT")
@@ -405,13 +365,31 @@ else:
         header = st.empty()
         paint_history()
         retriever = load_website(url)
+        with st.sidebar:
+            if st.button("바뀐 페이지 다시 학습하기"):
+                with st.spinner("바뀐 페이지 확인 중.."):
+                    result = refresh_website(url)
+                st.success(
+                    f"{result['fetched']}개 페이지 확인, {result['updated']}개 갱신, {result['removed']}개 삭제"
+                )
+                if result["failed"]:
+                    st.warning(
+                        f"{len(result['failed'])}개 페이지를 불러오지 못해 이전 내용을 유지합니다.\n\n"
+                        + "\n".join(f"- {failed}" for failed in result["failed"])
+                    )
+                retriever = load_website(url)
+        with st.sidebar:
+            cache_stats = load_answer_cache(url).stats()
+            st.caption(
+                f"답변 캐시 {cache_stats['entries']}개 · 적중률 {cache_stats['hit_rate']:.0%} · 절약한 시간 {cache_stats['saved_seconds']:.1f}초"
+            )
         header.info("웹 사이트 정보를 학습했습니다. 무엇이든 질문해 보세요.")
         query = st.chat_input(placeholder="웹 사이트에 대해 무엇이든 물어보세요!")
         if query:
             send_message(query, "human")
             chain = (
                 {
-                    "docs": retriever,
+                    "docs": RunnableLambda(retrieve_docs),
                     "question": RunnablePassthrough(),
                     "memory": st.session_state["memory"].load_memory_variables,
                 }
@@ -419,4 +397,7 @@ else:
                 | RunnableLambda(choose_answer)
             )
             with st.chat_message("ai"):
-                invoke_chain(query)
+                try:
+                    invoke_chain(query)
+                except Exception as e:
+                    st.error(f"답변을 만들지 못했습니다: {e}")
@@ -1,24 +1,29 @@
 from operator import itemgetter
 import streamlit as st
-import subprocess
-import math
-from pydub import AudioSegment
-import openai
-import glob
 import os
 from langchain.chat_models import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from langchain.document_loaders import TextLoader
+import json
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema.output_parser import StrOutputParser
-from langchain.storage import LocalFileStore
 from langchain.embeddings import OpenAIEmbeddings
-from langchain.vectorstores.faiss import FAISS
-from langchain.embeddings import CacheBackedEmbeddings
 from langchain.prompts import MessagesPlaceholder
 from langchain.schema.runnable import RunnablePassthrough, RunnableLambda
 from langchain.memory import ConversationBufferMemory
 from langchain.callbacks.base import BaseCallbackHandler
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.stores import packed_cache_backed_embeddings
+from utils.vectorstores import load_or_build_faiss
+from utils.transcription import (
+    ChunkTranscriber,
+    merge_segments,
+    segments_to_documents,
+    stitch_transcripts,
+)
+from utils.audio import load_chunks, segment_audio
+from utils.files import atomic_open
+from utils.meeting_search import TimeRangeSearch, format_timestamp
 
 
 class ChatCallbackHandler(BaseCallbackHandler):
@@ -56,73 +61,70 @@ streaming_llm = ChatOpenAI(
     callbacks=[ChatCallbackHandler()],
 )
 
+CHUNK_SECONDS = 10 * 60
+CHUNK_OVERLAP_SECONDS = 2
+SUMMARY_CONCURRENCY = 4
+REDUCE_TOKEN_LIMIT = 3000
+RETRIEVAL_WINDOW_SECONDS = 120
+SUMMARY_MODES = {
+    "refine": "정교하게 (순차 개선)",
+    "map_reduce": "빠르게 (병렬 요약 후 합치기)",
+}
+
 splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
     chunk_size=2400,
     chunk_overlap=300,
 )
 
 
-@st.cache_data(show_spinner="Embedding..")
+@st.cache_resource(show_spinner="Embedding..")
 def embed_file(file_name):
     file_path = f"./.cache/meeting_files/{file_name}"
-    cache_dir = LocalFileStore(f"./.cache/meeting_embeddings/{file_name}")
-    loader = TextLoader(file_path)
-    docs = loader.load_and_split(text_splitter=splitter)
     embeddings = OpenAIEmbeddings()
-    cached_embeddings = CacheBackedEmbeddings.from_bytes_store(embeddings, cache_dir)
+    cached_embeddings = packed_cache_backed_embeddings(
+        embeddings, "./.cache/meeting_embeddings.sqlite3"
+    )
 
-    vectorstore = FAISS.from_documents(docs, cached_embeddings)
+    def load_documents():
+        with open(file_path, encoding="utf-8") as f:
+            segments = json.load(f)
+        return segments_to_documents(
+            segments, RETRIEVAL_WINDOW_SECONDS, source=file_name
+        )
 
-    retriever = vectorstore.as_retriever()
+    vectorstore = load_or_build_faiss(
+        f"./.cache/meeting_indexes/{file_name}",
+        cached_embeddings,
+        load_documents,
+    )
 
-    return retriever
+    return TimeRangeSearch(vectorstore)
 
 
-@st.cache_data(show_spinner=False)
-def extract_audio_from_video(video_path):
-    audio_path = (
-        video_path.replace(".mp4", ".mp3")
-        .replace(".avi", ".mp3")
-        .replace(".mkv", ".mp3")
-        .replace(".mov", ".mp3")
-    )
-    if os.path.exists(audio_path):
-        return
-    command = ["ffmpeg", "-y", "-i", video_path, "-vn", audio_path]
-    subprocess.run(command)
+def get_segments_path(transcript_path):
+    return transcript_path.replace(".txt", ".segments.json")
 
 
-@st.cache_data(show_spinner=False)
-def cut_audio_in_chunks(video_name, audio_path, chunk_size, chunks_folder):
-    if os.path.exists(f"./.cache/chunks/{video_name}/00_chunk.mp3"):
-        return
-    chunk_len = chunk_size * 60 * 1000
-    track = AudioSegment.from_mp3(audio_path)
-    chunks = math.ceil(len(track) / chunk_len)
-    for i in range(chunks):
-        start_time = i * chunk_len
-        end_time = (i + 1) * chunk_len
-        chunk = track[start_time:end_time]
-        path = os.path.join("./.cache/chunks/", video_name)
-        os.mkdir(path)
-        chunk.export(
-            f"{chunks_folder}/{str(i).zfill(2)}_chunk.mp3",
-            format="mp3",
-        )
+def format_docs(docs):
+    return "\n\n".join(
+        f"[{format_timestamp(doc.metadata['start'])} - "
+        f"{format_timestamp(doc.metadata['end'])}] {doc.page_content}"
+        for doc in docs
+    )
 
 
-@st.cache_data(show_spinner=False)
-def transcribe_chunks(chunks_folder, destination):
-    if os.path.exists(destination):
+def transcribe_chunks(chunks, chunks_folder, destination):
+    segments_path = get_segments_path(destination)
+    if os.path.exists(destination) and os.path.exists(segments_path):
         return
-    files = glob.glob(f"{chunks_folder}/*.mp3")
-    for file in files:
-        with open(file, "rb") as audio_file, open(destination, "a") as text_file:
-            transcript = openai.Audio.transcribe(
-                "whisper-1",
-                audio_file,
-            )
-            text_file.write(transcript["text"])
+    transcripts = ChunkTranscriber().transcribe_all(chunks)
+    segments = merge_segments(transcripts, load_chunks(chunks_folder))
+    with atomic_open(segments_path, "w", encoding="utf-8") as f:
+        json.dump(segments, f, ensure_ascii=False)
+    with atomic_open(destination, "w") as text_file:
+        text_file.write(
+            stitch_transcripts(transcript["text"] for transcript in transcripts)
+        )
 
 
 @st.cache_data(show_spinner=False)
@@ -130,12 +132,6 @@ def process_video(video):
     st.write("영상 불러오는 중..")
     video_content = video.read()
     video_path = f"./.cache/meeting_files/{video.name}"
-    audio_path = (
-        video_path.replace(".mp4", ".mp3")
-        .replace(".avi", ".mp3")
-        .replace(".mkv", ".mp3")
-        .replace(".mov", ".mp3")
-    )
     transcript_path = (
         video_path.replace(".mp4", ".txt")
         .replace(".avi", ".txt")
@@ -144,12 +140,14 @@ def process_video(video):
     )
     with open(video_path, "wb") as f:
         f.write(video_content)
-    st.write("소리 추출 중..")
-    extract_audio_from_video(video_path)
-    st.write("소리 분할 중..")
-    cut_audio_in_chunks(video.name, audio_path, 10, chunks_folder)
-    st.write("대본 추출 중..")
+    st.write("소리 추출 및 대본 추출 중..")
     transcribe_chunks(
+        segment_audio(
+            video_path,
+            chunks_folder,
+            chunk_seconds=CHUNK_SECONDS,
+            overlap_seconds=CHUNK_OVERLAP_SECONDS,
+        ),
         chunks_folder,
         transcript_path,
     )
@@ -181,19 +179,82 @@ def invoke_chain(question):
     save_memory(question, result.content)
 
 
+first_summary_prompt = ChatPromptTemplate.from_template(
+    """
+    당신은 문서 요약 전문가입니다.
+    다음 문서를 정확하게 요약하세요.
+    
+    {text}
+"""
+)
+
+combine_prompt = ChatPromptTemplate.from_template(
+    """
+    당신은 문서 요약 전문가입니다.
+    다음은 한 회의의 연속된 부분들을 각각 요약한 것입니다.
+    중요한 정보를 빠뜨리지 말고 하나의 요약본으로 합치세요.
+    
+    {summaries}
+"""
+)
+
+
+def invoke_in_parallel(chain, inputs, progress_text):
+    my_bar = st.progress(0, text=f"{progress_text} (0/{len(inputs)})")
+    results = [None] * len(inputs)
+    with ThreadPoolExecutor(max_workers=SUMMARY_CONCURRENCY) as executor:
+        futures = {
+            executor.submit(chain.invoke, chain_input): i
+            for i, chain_input in enumerate(inputs)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            results[futures[future]] = future.result()
+            my_bar.progress(
+                done / len(inputs), text=f"{progress_text} ({done}/{len(inputs)})"
+            )
+    return results
+
+
+def group_by_tokens(summaries, limit):
+    # Every group takes at least two summaries so each level shrinks.
+    groups, tokens = [[]], 0
+    for summary in summaries:
+        summary_tokens = llm.get_num_tokens(summary)
+        if len(groups[-1]) >= 2 and tokens + summary_tokens > limit:
+            groups.append([])
+            tokens = 0
+        groups[-1].append(summary)
+        tokens += summary_tokens
+    return groups
+
+
+def map_reduce_summary(docs):
+    first_summary_chain = first_summary_prompt | llm | StrOutputParser()
+    combine_chain = combine_prompt | llm | StrOutputParser()
+    summaries = invoke_in_parallel(
+        first_summary_chain,
+        [{"text": doc.page_content} for doc in docs],
+        "요약본 생성하는 중..",
+    )
+    level = 1
+    while len(summaries) > 1:
+        groups = group_by_tokens(summaries, REDUCE_TOKEN_LIMIT)
+        summaries = invoke_in_parallel(
+            combine_chain,
+            [{"summaries": "\n\n".join(group)} for group in groups],
+            f"요약본 합치는 중.. {level}단계",
+        )
+        level += 1
+    return summaries[0]
+
+
 @st.cache_data(show_spinner=False)
-def generate_summary(transcript_path):
+def generate_summary(transcript_path, mode="refine"):
     loader = TextLoader(transcript_path)
     docs = loader.load_and_split(text_splitter=splitter)
 
-    first_summary_prompt = ChatPromptTemplate.from_template(
-        """
-        당신은 문서 요약 전문가입니다.
-        다음 문서를 정확하게 요약하세요.
-        
-        {text}
-    """
-    )
+    if mode == "map_reduce":
+        return map_reduce_summary(docs)
 
     progress_text = "요약본 생성하는 중.."
 
@@ -249,13 +310,19 @@ if video:
         with open(transcript_path, "r") as f:
             st.write(f.read())
     with summary_tab:
+        summary_mode = st.radio(
+            "요약 방식",
+            list(SUMMARY_MODES),
+            format_func=SUMMARY_MODES.get,
+            horizontal=True,
+        )
         start = st.button("요약 생성하기")
         if start or st.session_state["isSummaryGenerated"]:
-            summary = generate_summary(transcript_path)
+            summary = generate_summary(transcript_path, summary_mode)
             st.write(summary)
             st.session_state["isSummaryGenerated"] = True
     with chat_tab:
-        retriever = embed_file(transcript_path.split("/")[-1])
+        retriever = embed_file(get_segments_path(transcript_path).split("/")[-1])
         query = st.chat_input("회의에서 일어난 궁금한 일들을 물어보세요.")
         paint_history()
         chat_prompt = ChatPromptTemplate.from_messages(
@@ -267,6 +334,7 @@ if video:
 당신이 기존에 알고 있던 지식을 사용하지 마세요.
 모르는 내용이라면 모른다고 하고 지어내지 마세요.
 사용자의 질문은 보통 회의에 대해 질문 하는 것이니 당신의 생각을 이야기 하지 마세요.
+대본의 각 부분 앞에는 회의 시작부터의 시간이 [시작 - 끝] 형식으로 적혀 있습니다.
 ------대본------
 {context}
 ---------------
@@ -280,7 +348,7 @@ if video:
             send_message(query, "human")
             chain = (
                 {
-                    "context": retriever,
+                    "context": RunnableLambda(retriever.invoke) | format_docs,
                     "question": RunnablePassthrough(),
                     "history": RunnableLambda(
                         st.session_state.memory.load_memory_variables
@@ -3,11 +3,13 @@ import os
 from typing import Type
 from langchain.chat_models import ChatOpenAI
 from langchain.tools import BaseTool
+from langchain.tools.base import ToolException
 from langchain.agents import initialize_agent, AgentType
 from pydantic import BaseModel, Field
 from langchain.utilities import DuckDuckGoSearchAPIWrapper
 from langchain.schema import SystemMessage
 import requests
+from utils.financial_cache import get_financial_cache
 
 st.set_page_config(page_title="InvestorGPT", page_icon="🧑‍💻")
 
@@ -24,6 +26,22 @@ llm = ChatOpenAI(temperature=0.1)
 
 alpha_vantage_api_key = os.environ.get("ALPHA_VANTAGE_API_KEY")
 
+financial_cache = get_financial_cache()
+
+
+def alpha_vantage(function, symbol):
+    r = requests.get(
+        "https://www.alphavantage.co/query",
+        params={"function": function, "symbol": symbol, "apikey": alpha_vantage_api_key},
+    )
+    response = r.json()
+    # Rate-limit and error replies come back as 200s; they must not be cached,
+    # and the agent gets them as the tool's observation instead.
+    for key in ("Note", "Information", "Error Message"):
+        if key in response:
+            raise ToolException(response[key])
+    return response
+
 
 class StockMarketSymbolSearchToolArgsSchema(BaseModel):
     query: str = Field(description="The query you will search for")
@@ -35,6 +53,7 @@ class CompanyArgsSchema(BaseModel):
 
 class CompanyOverviewTool(BaseTool):
     name = "CompanyOverviewTool"
+    handle_tool_error = True
     description = """
         회사의 재정 개요에 대해 알아보려면 이 툴을 사용하세요.
         주식 심볼을 입력해야 합니다.
@@ -42,14 +61,14 @@ class CompanyOverviewTool(BaseTool):
     args_schema: Type[CompanyArgsSchema] = CompanyArgsSchema
 
     def _run(self, symbol):
-        r = requests.get(
-            f"https://www.alphavantage.co/query?function=OVERVIEW&symbol={symbol}&apikey={alpha_vantage_api_key}"
+        return financial_cache.get(
+            "OVERVIEW", symbol, lambda: alpha_vantage("OVERVIEW", symbol)
         )
-        return r.json()
 
 
 class CompanyIncomeStatementTool(BaseTool):
     name = "CompanyIncomeStatementTool"
+    handle_tool_error = True
     description = """
         회사의 손익 계산서에 대해 알아보려면 이 툴을 사용하세요.
         주식 심볼을 입력해야 합니다.
@@ -57,14 +76,16 @@ class CompanyIncomeStatementTool(BaseTool):
     args_schema: Type[CompanyArgsSchema] = CompanyArgsSchema
 
     def _run(self, symbol):
-        r = requests.get(
-            f"https://www.alphavantage.co/query?function=INCOME_STATEMENT&symbol={symbol}&apikey={alpha_vantage_api_key}"
+        return financial_cache.get(
+            "INCOME_STATEMENT",
+            symbol,
+            lambda: alpha_vantage("INCOME_STATEMENT", symbol)["annualReports"],
         )
-        return r.json()["annualReports"]
 
 
 class CompanyStockPerformanceTool(BaseTool):
     name = "CompanyStockPerformanceTool"
+    handle_tool_error = True
     description = """
         이걸 회사의 주간 성과를 알아보는데에 사용해.
         주식 심볼을 입력해야 합니다.
@@ -72,11 +93,13 @@ class CompanyStockPerformanceTool(BaseTool):
     args_schema: Type[CompanyArgsSchema] = CompanyArgsSchema
 
     def _run(self, symbol):
-        r = requests.get(
-            f"https://www.alphavantage.co/query?function=TIME_SERIES_WEEKLY&symbol={symbol}&apikey={alpha_vantage_api_key}"
+        return financial_cache.get(
+            "TIME_SERIES_WEEKLY",
+            symbol,
+            lambda: list(
+                alpha_vantage("TIME_SERIES_WEEKLY", symbol)["Weekly Time Series"].items()
+            )[:200],
         )
-        response = r.json()
-        return list(response["Weekly Time Series"].items()[:200])
 
 
 class StockMarketSymbolSearchTool(BaseTool):
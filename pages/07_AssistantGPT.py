@@ -2,32 +2,84 @@ import streamlit as st
 import openai as client
 from langchain.utilities.duckduckgo_search import DuckDuckGoSearchAPIWrapper
 import yfinance
+import requests
 import json
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.assistant_runs import RunDriver, RunFailed
+from utils.financial_cache import get_financial_cache
 
+TOOL_WORKERS = 8
 
-def get_ticker(inputs):
-    ddg = DuckDuckGoSearchAPIWrapper()
+
+def create_session():
+    # Recent yfinance releases only accept curl_cffi sessions.
+    try:
+        from curl_cffi import requests as curl_requests
+
+        return curl_requests.Session(impersonate="chrome")
+    except ImportError:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=TOOL_WORKERS)
+        session.mount("https://", adapter)
+        return session
+
+
+@st.cache_resource
+def get_session():
+    return create_session()
+
+
+ddg = DuckDuckGoSearchAPIWrapper()
+
+financial_cache = get_financial_cache()
+
+
+class StepTickers:
+    # One yfinance.Ticker per symbol for a single action step, so the
+    # concurrent tool calls about the same company share it.
+    def __init__(self, session):
+        self.session = session
+        self.tickers = {}
+        self.lock = threading.Lock()
+
+    def get(self, symbol):
+        with self.lock:
+            if symbol not in self.tickers:
+                self.tickers[symbol] = yfinance.Ticker(symbol, session=self.session)
+            return self.tickers[symbol]
+
+
+def get_ticker(inputs, tickers):
     company_name = inputs["company_name"]
     return ddg.run(f"Ticker symbol of {company_name}")
 
 
-def get_income_statement(inputs):
+def get_income_statement(inputs, tickers):
     ticker = inputs["ticker"]
-    stock = yfinance.Ticker(ticker)
-    return json.dumps(stock.income_stmt.to_json())
+    return financial_cache.get(
+        "yfinance.income_stmt",
+        ticker,
+        lambda: json.dumps(tickers.get(ticker).income_stmt.to_json()),
+    )
 
 
-def get_balance_sheet(inputs):
+def get_balance_sheet(inputs, tickers):
     ticker = inputs["ticker"]
-    stock = yfinance.Ticker(ticker)
-    return json.dumps(stock.balance_sheet.to_json())
+    return financial_cache.get(
+        "yfinance.balance_sheet",
+        ticker,
+        lambda: json.dumps(tickers.get(ticker).balance_sheet.to_json()),
+    )
 
 
-def get_daily_stock_performance(inputs):
+def get_daily_stock_performance(inputs, tickers):
     ticker = inputs["ticker"]
-    stock = yfinance.Ticker(ticker)
-    return json.dumps(stock.history(period="3mo").to_json())
+    return financial_cache.get(
+        "yfinance.history_3mo",
+        ticker,
+        lambda: json.dumps(tickers.get(ticker).history(period="3mo").to_json()),
+    )
 
 
 def send_message(thread_id, content):
@@ -38,38 +90,21 @@ def send_message(thread_id, content):
     )
 
 
-def get_run(run_id, thread_id):
-    return client.beta.threads.runs.retrieve(run_id=run_id, thread_id=thread_id)
+def call_tool(action, tickers):
+    function = action.function
+    print(f"Calling function: {function.name} with args {function.arguments}")
+    return {
+        "tool_call_id": action.id,
+        "output": functions_map[function.name](json.loads(function.arguments), tickers),
+    }
 
 
-def get_messages(thread_id):
-    messages = client.beta.threads.messages.list(thread_id=thread_id)
-    messages = list(messages)
-    messages.reverse()
-    return messages
-
-
-def get_tool_outputs(run_id, thread_id):
-    run = get_run(run_id, thread_id)
-    outputs = []
-    for action in run.required_action.submit_tool_outputs.tool_calls:
-        action_id = action.id
-        function = action.function
-        print(f"Calling function: {function.name} with args {function.arguments}")
-        outputs.append(
-            {
-                "tool_call_id": action_id,
-                "output": functions_map[function.name](json.loads(function.arguments)),
-            }
-        )
-    return outputs
-
-
-def submit_tool_outputs(run_id, thread_id):
-    outputs = get_tool_outputs(run.id, thread.id)
-    return client.beta.threads.runs.submit_tool_outputs(
-        run_id=run_id, thread_id=thread_id, tool_outputs=outputs
-    )
+def get_tool_outputs(tool_calls):
+    # The calls of one step run concurrently, so the step takes as long as
+    # its slowest call; outputs keep the order of the tool calls.
+    tickers = StepTickers(get_session())
+    with ThreadPoolExecutor(max_workers=TOOL_WORKERS) as executor:
+        return list(executor.map(lambda action: call_tool(action, tickers), tool_calls))
 
 
 def paint_message(message, role, save=True):
@@ -200,29 +235,27 @@ if query:
     else:
         thread = st.session_state["thread"]
         send_message(thread.id, query)
-    run = client.beta.threads.runs.create(
-        thread_id=st.session_state["thread"].id,
-        assistant_id=assistant_id,
-    )
     with st.chat_message("ai"):
-        with st.spinner("답변 생성 중.."):
-            while get_run(run.id, thread.id).status in [
-                "queued",
-                "in_progress",
-                "requires_action",
-            ]:
-                if get_run(run.id, thread.id).status == "requires_action":
-                    submit_tool_outputs(run.id, thread.id)
-                    time.sleep(0.5)
-                else:
-                    time.sleep(0.5)
-            message = (
-                get_messages(thread.id)[-1].content[0].text.value.replace("$", "\$")
-            )
+        message_box = st.empty()
+        streamed = []
+
+        def paint_delta(text):
+            streamed.append(text)
+            message_box.markdown("".join(streamed).replace("$", "\$"))
+
+        driver = RunDriver(client, handle_tool_calls=get_tool_outputs, on_text=paint_delta)
+        try:
+            with st.spinner("답변 생성 중.."):
+                message = driver.run(thread.id, assistant_id).replace("$", "\$")
+        except RunFailed as e:
+            # The partial answer is dropped and not kept in the history.
+            message_box.empty()
+            st.error(str(e))
+        else:
             st.session_state["messages"].append(
                 {
                     "message": message,
                     "role": "ai",
                 }
             )
-            st.markdown(message)
+            message_box.markdown(message)
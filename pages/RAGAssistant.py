@@ -1,7 +1,7 @@
-import time
 import streamlit as st
 import openai as client
 import re
+from utils.assistant_runs import RunDriver, RunFailed
 
 st.set_page_config(
     page_title="RAGAssistant",
@@ -25,10 +25,6 @@ def get_messages(thread_id):
     return messages
 
 
-def get_run(run_id, thread_id):
-    return client.beta.threads.runs.retrieve(run_id=run_id, thread_id=thread_id)
-
-
 def send_message(thread_id, content):
     return client.beta.threads.messages.create(
         thread_id=thread_id,
@@ -37,6 +33,10 @@ def send_message(thread_id, content):
     )
 
 
+def format_message(text):
+    return re.sub(r"【[^】]*】", "", text.replace("$", "\$"))
+
+
 def paint_message(message, role):
     with st.chat_message(role):
         st.markdown(message)
@@ -45,9 +45,7 @@ def paint_message(message, role):
 def paint_history(thread):
     messages = get_messages(thread.id)
     for message in messages:
-        formatted_text = re.sub(
-            r"【[^】]*】", "", message.content[0].text.value.replace("$", "\$")
-        )
+        formatted_text = format_message(message.content[0].text.value)
         if message.role == "assistant":
             paint_message(formatted_text, "ai")
         else:
@@ -97,23 +95,19 @@ if file:
             else:
                 thread = st.session_state["thread"]
                 send_message(thread.id, query)
-            with st.spinner("답변 생성 중.."):
-                run = client.beta.threads.runs.create(
-                    thread_id=thread.id,
-                    assistant_id=assistant_id,
-                )
-                while get_run(run.id, thread.id).status in [
-                    "queued",
-                    "in_progress",
-                    "requires_action",
-                ]:
-                    time.sleep(0.5)
-                st.markdown(
-                    re.sub(
-                        r"【[^】]*】",
-                        "",
-                        get_messages(thread.id)[-1]
-                        .content[0]
-                        .text.value.replace("$", "\$"),
-                    )
-                )
+            message_box = st.empty()
+            streamed = []
+
+            def paint_delta(text):
+                streamed.append(text)
+                message_box.markdown(format_message("".join(streamed)))
+
+            driver = RunDriver(client, on_text=paint_delta)
+            try:
+                with st.spinner("답변 생성 중.."):
+                    message = driver.run(thread.id, assistant_id)
+            except RunFailed as e:
+                message_box.empty()
+                st.error(str(e))
+            else:
+                message_box.markdown(format_message(message))
@@ -0,0 +1,158 @@
+from types import SimpleNamespace
+
+import pytest
+
+from utils.assistant_runs import RunDriver, RunFailed
+
+
+def event(name, **data):
+    return SimpleNamespace(event=name, data=SimpleNamespace(**data))
+
+
+def text_delta(value):
+    content = SimpleNamespace(type="text", text=SimpleNamespace(value=value))
+    return event("thread.message.delta", delta=SimpleNamespace(content=[content]))
+
+
+def requires_action(run_id, *tool_calls):
+    action = SimpleNamespace(submit_tool_outputs=SimpleNamespace(tool_calls=list(tool_calls)))
+    return event("thread.run.requires_action", id=run_id, status="requires_action", required_action=action)
+
+
+class Manager:
+    def __init__(self, events):
+        self.events = events
+        self.entered = False
+        self.exited = False
+
+    def __enter__(self):
+        self.entered = True
+        return iter(self.events)
+
+    def __exit__(self, *exc):
+        self.exited = True
+
+
+class StreamingRuns:
+    def __init__(self, first, *follow_ups):
+        self.first = first
+        self.follow_ups = list(follow_ups)
+        self.submitted = []
+
+    def stream(self, thread_id, assistant_id):
+        return self.first
+
+    def submit_tool_outputs_stream(self, thread_id, run_id, tool_outputs):
+        self.submitted.append((run_id, tool_outputs))
+        return self.follow_ups.pop(0)
+
+
+class PollingRuns:
+    def __init__(self, statuses, after_submit=()):
+        self.statuses = list(statuses)
+        self.after_submit = list(after_submit)
+        self.retrieves = 0
+        self.submitted = []
+
+    def run(self, status):
+        action = SimpleNamespace(
+            submit_tool_outputs=SimpleNamespace(tool_calls=[SimpleNamespace(id="call_1")])
+        )
+        return SimpleNamespace(id="run_1", status=status, required_action=action)
+
+    def create(self, thread_id, assistant_id):
+        return self.run(self.statuses.pop(0))
+
+    def retrieve(self, run_id, thread_id):
+        self.retrieves += 1
+        return self.run(self.statuses.pop(0))
+
+    def submit_tool_outputs(self, thread_id, run_id, tool_outputs):
+        self.submitted.append(tool_outputs)
+        self.statuses = self.after_submit + self.statuses
+        self.after_submit = []
+        return self.run(self.statuses.pop(0))
+
+
+def client(runs, reply="완료"):
+    message = SimpleNamespace(content=[SimpleNamespace(text=SimpleNamespace(value=reply))])
+    messages = SimpleNamespace(list=lambda **kwargs: [message])
+    return SimpleNamespace(beta=SimpleNamespace(threads=SimpleNamespace(runs=runs, messages=messages)))
+
+
+def answer_tool_calls(tool_calls):
+    return [{"tool_call_id": call.id, "output": "42"} for call in tool_calls]
+
+
+def test_stream_continues_across_submit_tool_outputs_stream():
+    first = Manager(
+        [
+            event("thread.message.created"),
+            text_delta("검색해 볼게요."),
+            requires_action("run_1", SimpleNamespace(id="call_1")),
+            text_delta("never reached"),
+        ]
+    )
+    second = Manager(
+        [
+            event("thread.message.created"),
+            text_delta("답은 "),
+            text_delta("42입니다."),
+            event("thread.run.completed"),
+        ]
+    )
+    runs = StreamingRuns(first, second)
+    streamed = []
+    driver = RunDriver(client(runs), answer_tool_calls, on_text=streamed.append)
+
+    text = driver.run("thread_1", "asst_1")
+
+    assert text == "검색해 볼게요.\n\n답은 42입니다."
+    assert "".join(streamed) == text
+    assert runs.submitted == [("run_1", [{"tool_call_id": "call_1", "output": "42"}])]
+    assert first.exited and second.entered and second.exited
+
+
+@pytest.mark.parametrize("status", ["failed", "expired", "cancelled"])
+def test_stream_surfaces_unsuccessful_runs(status):
+    runs = StreamingRuns(Manager([text_delta("부분 "), event(f"thread.run.{status}")]))
+    with pytest.raises(RunFailed) as error:
+        RunDriver(client(runs)).run("thread_1", "asst_1")
+    assert error.value.status == status
+
+
+def test_stream_requires_a_tool_handler():
+    runs = StreamingRuns(Manager([requires_action("run_1", SimpleNamespace(id="call_1"))]))
+    with pytest.raises(RunFailed):
+        RunDriver(client(runs)).run("thread_1", "asst_1")
+
+
+def test_poll_backs_off_with_one_retrieve_per_tick():
+    runs = PollingRuns(["queued"] + ["in_progress"] * 7 + ["completed"])
+    delays = []
+    driver = RunDriver(client(runs), sleep=delays.append)
+
+    assert driver.run("thread_1", "asst_1") == "완료"
+    assert runs.retrieves == len(delays) == 8
+    assert delays == pytest.approx([0.1, 0.2, 0.4, 0.8, 1.6, 2.0, 2.0, 2.0])
+
+
+def test_poll_resets_backoff_after_submitting_tool_outputs():
+    runs = PollingRuns(
+        ["queued", "in_progress", "in_progress", "requires_action"],
+        after_submit=["in_progress", "in_progress", "completed"],
+    )
+    delays = []
+    driver = RunDriver(client(runs), answer_tool_calls, sleep=delays.append)
+
+    assert driver.run("thread_1", "asst_1") == "완료"
+    assert runs.submitted == [[{"tool_call_id": "call_1", "output": "42"}]]
+    assert delays == pytest.approx([0.1, 0.2, 0.4, 0.1, 0.2])
+
+
+@pytest.mark.parametrize("status", ["failed", "expired", "cancelled"])
+def test_poll_surfaces_unsuccessful_runs(status):
+    runs = PollingRuns(["queued", "in_progress", status])
+    with pytest.raises(RunFailed) as error:
+        RunDriver(client(runs), sleep=lambda delay: None).run("thread_1", "asst_1")
+    assert error.value.status == status
@@ -0,0 +1,91 @@
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.crawler import SitemapCrawler
+from utils.site_index import refresh_site
+
+PAGES = {
+    "/docs/a": b"<html><body>A</body></html>",
+    "/docs/b": b"<html><body>B</body></html>",
+}
+FAILING = {"/docs/missing": 404, "/docs/down": 503}
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/sitemap.xml":
+            base = f"http://{self.headers['Host']}"
+            urls = "".join(
+                f"<url><loc>{base}{path}</loc><lastmod>2024-01-01</lastmod></url>"
+                for path in [*PAGES, *FAILING]
+            )
+            body = (
+                '<?xml version="1.0" encoding="UTF-8"?>'
+                f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+            ).encode()
+        elif self.path in PAGES:
+            body = PAGES[self.path]
+        else:
+            self.send_response(FAILING.get(self.path, 404))
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SiteHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def crawler(tmp_path):
+    return SitemapCrawler(delay=0, retries=1, backoff=0, cache_path=str(tmp_path / "http.sqlite3"))
+
+
+def test_failed_pages_are_logged_and_collected(site, crawler, caplog):
+    with caplog.at_level(logging.WARNING, logger="utils.crawler"):
+        pages = {entry["loc"]: body for entry, body in crawler.iter_pages(f"{site}/sitemap.xml")}
+
+    assert pages == {f"{site}{path}": body for path, body in PAGES.items()}
+    assert sorted(crawler.failed) == sorted(f"{site}{path}" for path in FAILING)
+    assert all(f"{site}{path}" in caplog.text for path in FAILING)
+
+
+class FakeVectorStore:
+    def __init__(self):
+        self.index_to_docstore_id = {}
+        self.added = []
+
+    def delete(self, ids):
+        pass
+
+    def add_documents(self, docs):
+        self.added.extend(docs)
+
+
+def test_refresh_site_reports_failed_pages(site, crawler):
+    vector_store = FakeVectorStore()
+    result = refresh_site(
+        vector_store,
+        f"{site}/sitemap.xml",
+        crawler,
+        lambda entry, body: [entry["loc"]],
+    )
+
+    assert result["fetched"] == 4
+    assert result["updated"] == 2
+    assert sorted(result["failed"]) == sorted(f"{site}{path}" for path in FAILING)
+    assert sorted(vector_store.added) == sorted(f"{site}{path}" for path in PAGES)
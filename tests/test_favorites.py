@@ -0,0 +1,30 @@
+import asyncio
+
+from chef.favorites import SQLiteFavoritesStore
+
+
+def test_cancelled_add_does_not_strand_the_rest_of_the_batch(tmp_path):
+    async def main():
+        store = SQLiteFavoritesStore(str(tmp_path / "favorites.sqlite3"), batch_window=0.05)
+        cancelled = asyncio.create_task(store.add("token", "kimchi"))
+        kept = asyncio.create_task(store.add("token", "bibimbap"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.wait_for(kept, timeout=2)
+        favorites = await store.get("token")
+        await store.close()
+        return favorites
+
+    assert asyncio.run(main()) == ["kimchi", "bibimbap"]
+
+
+def test_add_and_get_keep_insertion_order(tmp_path):
+    async def main():
+        store = SQLiteFavoritesStore(str(tmp_path / "favorites.sqlite3"), max_items=2)
+        for name in ["a", "b", "c"]:
+            await store.add("token", name)
+        favorites = await store.get("token")
+        await store.close()
+        return favorites
+
+    assert asyncio.run(main()) == ["b", "c"]
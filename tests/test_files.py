@@ -0,0 +1,66 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.files import atomic_directory, atomic_open, write_atomic
+
+
+def test_concurrent_writers_in_one_process_do_not_share_a_temp_file(tmp_path):
+    path = str(tmp_path / "cache" / "answers.json")
+    payloads = [str(i) * 100_000 for i in range(10)]
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        list(executor.map(lambda data: write_atomic(path, data), payloads * 5))
+
+    with open(path, encoding="utf-8") as f:
+        assert f.read() in payloads
+    assert os.listdir(tmp_path / "cache") == ["answers.json"]
+
+
+def test_failed_write_keeps_the_old_file(tmp_path):
+    path = str(tmp_path / "bank.json")
+    write_atomic(path, b"old")
+
+    with pytest.raises(ValueError):
+        with atomic_open(path, "w") as f:
+            f.write("partial")
+            raise ValueError
+
+    with open(path, "rb") as f:
+        assert f.read() == b"old"
+    assert os.listdir(tmp_path) == ["bank.json"]
+
+
+def test_atomic_directory_replaces_the_old_directory(tmp_path):
+    path = str(tmp_path / "index")
+    with atomic_directory(path) as tmp:
+        open(os.path.join(tmp, "old"), "w").close()
+    with atomic_directory(path) as tmp:
+        open(os.path.join(tmp, "new"), "w").close()
+
+    assert os.listdir(path) == ["new"]
+    assert os.listdir(tmp_path) == ["index"]
+
+
+def test_atomic_directory_keeps_an_index_in_place_while_the_old_one_is_deleted(
+    tmp_path, monkeypatch
+):
+    path = str(tmp_path / "index")
+    with atomic_directory(path) as tmp:
+        open(os.path.join(tmp, "old"), "w").close()
+
+    seen = []
+    rmtree = shutil.rmtree
+
+    def checked_rmtree(target, *args, **kwargs):
+        seen.append(os.listdir(path))
+        rmtree(target, *args, **kwargs)
+
+    monkeypatch.setattr(shutil, "rmtree", checked_rmtree)
+    with atomic_directory(path) as tmp:
+        open(os.path.join(tmp, "new"), "w").close()
+
+    assert seen == [["new"]]
+    assert os.listdir(tmp_path) == ["index"]
@@ -0,0 +1,80 @@
+import json
+import os
+import random
+
+import pytest
+
+from utils.json_stream import ArrayItemParser
+
+STREAM_PATH = os.path.join(os.path.dirname(__file__), "data", "quiz_arguments_stream.json")
+
+
+@pytest.fixture
+def deltas():
+    # Function-call argument deltas for a get_questions call, split into
+    # token-sized pieces the way the chat completions stream sends them.
+    with open(STREAM_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def feed_all(parser, pieces):
+    items = []
+    for piece in pieces:
+        items.extend(parser.feed(piece))
+    return items
+
+
+def test_recorded_stream_yields_every_question(deltas):
+    expected = json.loads("".join(deltas))["questions"]
+    assert feed_all(ArrayItemParser(), deltas) == expected
+
+
+def test_each_question_is_emitted_when_its_closing_brace_arrives(deltas):
+    parser = ArrayItemParser()
+    text = ""
+    for delta in deltas:
+        text += delta
+        for item in parser.feed(delta):
+            # Nothing of the next question has been streamed yet.
+            assert text.rstrip().endswith("}")
+            assert json.dumps(item["question"], ensure_ascii=False) in text
+    questions = json.loads(text)["questions"]
+    parser = ArrayItemParser()
+    emitted = []
+    for delta in deltas:
+        emitted.extend(item["question"] for item in parser.feed(delta))
+    assert emitted == [question["question"] for question in questions]
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_arbitrary_split_points(deltas, seed):
+    text = "".join(deltas)
+    rng = random.Random(seed)
+    cuts = sorted(rng.sample(range(1, len(text)), rng.randint(1, 60)))
+    pieces = [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+    assert feed_all(ArrayItemParser(), pieces) == json.loads(text)["questions"]
+
+
+def test_single_character_deltas(deltas):
+    text = "".join(deltas)
+    assert feed_all(ArrayItemParser(), text) == json.loads(text)["questions"]
+
+
+def test_escaped_quotes_and_braces_inside_strings():
+    text = json.dumps(
+        {
+            "questions": [
+                {"question": 'a "quoted" {brace} [bracket] \\ slash }', "answers": []},
+                {"question": '\\"}]', "answers": [{"answer": "{", "correct": True}]},
+            ]
+        }
+    )
+    assert feed_all(ArrayItemParser(), text) == json.loads(text)["questions"]
+
+
+def test_truncated_final_object_is_not_emitted(deltas):
+    text = "".join(deltas)
+    last_start = text.rindex("{", 0, text.rindex('"question"'))
+    truncated = text[: last_start + 60]
+    items = feed_all(ArrayItemParser(), truncated)
+    assert items == json.loads(text)["questions"][:-1]
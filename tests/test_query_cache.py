@@ -0,0 +1,70 @@
+import asyncio
+import gc
+from types import SimpleNamespace
+
+import pytest
+
+from chef.query_cache import EmbeddingBatcher
+
+
+class SlowEmbeddings:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = []
+
+    async def aembed_documents(self, texts):
+        self.calls.append(texts)
+        await asyncio.sleep(self.delay)
+        return [[float(len(text))] for text in texts]
+
+
+def batcher(embeddings):
+    upstream = SimpleNamespace(session=None, semaphore=asyncio.Semaphore(4))
+    return EmbeddingBatcher(embeddings, upstream, window=0.01)
+
+
+def test_concurrent_embeds_share_one_batch():
+    async def main():
+        embeddings = SlowEmbeddings()
+        embedder = batcher(embeddings)
+        embedder.start()
+        vectors = await asyncio.gather(*(embedder.embed(text) for text in ["a", "bb", "a"]))
+        await embedder.stop()
+        return embeddings.calls, vectors, embedder.batch_tasks
+
+    calls, vectors, batch_tasks = asyncio.run(main())
+    assert calls == [["a", "bb"]]
+    assert vectors == [[1.0], [2.0], [1.0]]
+    assert not batch_tasks
+
+
+def test_in_flight_batch_is_kept_until_it_finishes():
+    async def main():
+        embedder = batcher(SlowEmbeddings())
+        embedder.start()
+        pending = asyncio.ensure_future(embedder.embed("recipe"))
+        await asyncio.sleep(0.02)
+        in_flight = len(embedder.batch_tasks)
+        gc.collect()
+        vector = await pending
+        await embedder.stop()
+        return in_flight, vector, embedder.batch_tasks
+
+    in_flight, vector, batch_tasks = asyncio.run(main())
+    assert in_flight == 1
+    assert vector == [6.0]
+    assert not batch_tasks
+
+
+def test_stop_cancels_in_flight_batches_and_their_callers():
+    async def main():
+        embedder = batcher(SlowEmbeddings(delay=10))
+        embedder.start()
+        pending = asyncio.ensure_future(embedder.embed("recipe"))
+        await asyncio.sleep(0.02)
+        await asyncio.wait_for(embedder.stop(), 1)
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+        return embedder.batch_tasks
+
+    assert not asyncio.run(main())
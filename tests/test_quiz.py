@@ -0,0 +1,48 @@
+import math
+
+import numpy as np
+from langchain.schema import Document
+
+from utils.quiz import QuestionBank
+
+
+class FakeEmbeddings:
+    def embed_documents(self, texts):
+        rng = np.random.default_rng(0)
+        return rng.normal(size=(len(texts), 16)).tolist()
+
+
+def build(tmp_path, doc_count, size=10):
+    counts = []
+
+    def generate(doc, count):
+        counts.append(count)
+        for i in range(count):
+            yield {
+                "question": f"{doc.page_content}에 대한 {i}번 문제 {'가나다라마바사'[i % 7] * (i + 1)}",
+                "answers": [{"answer": "정답", "correct": True}],
+            }
+
+    docs = [Document(page_content=f"문서{i}") for i in range(doc_count)]
+    bank = QuestionBank("quiz", cache_path=str(tmp_path))
+    list(bank.build(docs, generate, FakeEmbeddings(), size=size, chunks=8))
+    return bank, counts
+
+
+def test_few_chunks_still_fill_a_quiz(tmp_path):
+    bank, counts = build(tmp_path, 1)
+    assert counts == [15]
+    assert len(bank.draw(10)["questions"]) == 10
+
+
+def test_per_chunk_count_spreads_over_sampled_chunks(tmp_path):
+    _, counts = build(tmp_path / "a", 3)
+    assert counts == [5, 5, 5]
+    _, counts = build(tmp_path / "b", 40)
+    assert len(counts) <= 8
+    assert all(count == math.ceil(15 / len(counts)) for count in counts)
+
+
+def test_bank_is_reused_from_disk(tmp_path):
+    bank, _ = build(tmp_path, 3)
+    assert QuestionBank("quiz", cache_path=str(tmp_path)).questions == bank.questions
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from utils.semantic_cache import SemanticCache
+
+
+class KeywordEmbeddings:
+    # Questions mentioning the same product embed to the same direction.
+    TOPICS = ["Workers AI", "Vectorize", "AI Gateway"]
+
+    def embed_query(self, text):
+        return [float(topic in text) for topic in self.TOPICS] + [0.01]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "site_answers" / "docs.sqlite3")
+
+
+def add(cache, question, answer):
+    _, vector = cache.lookup(question)
+    cache.add(question, vector, answer, latency=3.0)
+
+
+def test_processes_share_entries_instead_of_overwriting(path):
+    # Two caches on one file stand in for two Streamlit processes.
+    first = SemanticCache(path, KeywordEmbeddings())
+    second = SemanticCache(path, KeywordEmbeddings())
+    add(first, "Workers AI 요금은?", "뉴런 단위 https://developers.cloudflare.com/workers-ai/")
+    add(second, "Vectorize 한도는?", "500만 벡터")
+
+    entry, _ = first.lookup("Vectorize 한도는?")
+    assert entry["answer"] == "500만 벡터"
+    entry, _ = second.lookup("Workers AI 요금은?")
+    assert entry["sources"] == ["https://developers.cloudflare.com/workers-ai/"]
+    assert SemanticCache(path, KeywordEmbeddings()).stats()["entries"] == 2
+
+
+def test_clear_in_one_process_is_seen_by_the_others(path):
+    first = SemanticCache(path, KeywordEmbeddings())
+    second = SemanticCache(path, KeywordEmbeddings())
+    add(first, "Workers AI 요금은?", "뉴런 단위")
+    assert second.lookup("Workers AI 요금은?")[0] is not None
+
+    first.clear()
+    add(first, "AI Gateway 캐시는?", "TTL 설정")
+
+    assert second.lookup("Workers AI 요금은?")[0] is None
+    assert second.lookup("AI Gateway 캐시는?")[0]["answer"] == "TTL 설정"
+    assert second.stats()["entries"] == 1
+
+
+def test_dissimilar_question_misses(path):
+    cache = SemanticCache(path, KeywordEmbeddings(), threshold=0.95)
+    add(cache, "Workers AI 요금은?", "뉴런 단위")
+    assert cache.lookup("Vectorize 한도는?")[0] is None
+    assert np.isclose(cache.stats()["hit_rate"], 0.0)
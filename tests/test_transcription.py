@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+
+from utils.transcription import ChunkTranscriber
+
+
+class Flaky(Exception):
+    pass
+
+
+class FakeWhisper:
+    # Earlier chunks take longer, so chunks finish in reverse order; the
+    # chunk named in `fail_once` raises one transient error first.
+    def __init__(self, fail_once=None):
+        self.fail_once = fail_once
+        self.calls = []
+        self.finished = []
+        self.lock = threading.Lock()
+
+    def __call__(self, audio_file, response_format):
+        name = audio_file.read().decode()
+        with self.lock:
+            self.calls.append(name)
+            if name == self.fail_once:
+                self.fail_once = None
+                raise Flaky(name)
+        time.sleep(0.05 * (4 - int(name[-1])))
+        with self.lock:
+            self.finished.append(name)
+        return {"text": f"{name} 전사", "segments": [], "format": response_format}
+
+
+@pytest.fixture
+def chunks(tmp_path):
+    paths = []
+    for i in range(4):
+        path = tmp_path / "chunks" / f"chunk_{i}.mp3"
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(f"chunk_{i}".encode())
+        paths.append(str(path))
+    return paths
+
+
+def transcriber(whisper, tmp_path):
+    return ChunkTranscriber(
+        transcribe=whisper,
+        cache_path=str(tmp_path / "transcripts"),
+        backoff=0,
+        transient_errors=(Flaky,),
+    )
+
+
+def test_results_keep_chunk_order_and_transient_errors_are_retried(chunks, tmp_path):
+    whisper = FakeWhisper(fail_once="chunk_2")
+    results = transcriber(whisper, tmp_path).transcribe_all(chunks)
+
+    assert [result["text"] for result in results] == [f"chunk_{i} 전사" for i in range(4)]
+    assert whisper.finished != sorted(whisper.finished)
+    assert whisper.calls.count("chunk_2") == 2
+    assert len(whisper.calls) == 5
+
+
+def test_cache_is_reused_by_content_hash(chunks, tmp_path):
+    transcriber(FakeWhisper(), tmp_path).transcribe_all(chunks)
+
+    # Same audio under another name, as after re-uploading the same video.
+    copy = tmp_path / "chunk_copy.mp3"
+    copy.write_bytes(b"chunk_1")
+    whisper = FakeWhisper()
+    results = transcriber(whisper, tmp_path).transcribe_all([*chunks, str(copy)])
+
+    assert whisper.calls == []
+    assert results[-1] == results[1]
+
+
+def test_persistent_errors_are_raised_after_the_retries(chunks, tmp_path):
+    calls = []
+
+    def always_down(audio_file, response_format):
+        calls.append(audio_file.name)
+        raise Flaky("down")
+
+    broken = ChunkTranscriber(
+        transcribe=always_down,
+        cache_path=str(tmp_path / "transcripts"),
+        retries=2,
+        backoff=0,
+        transient_errors=(Flaky,),
+    )
+    with pytest.raises(Flaky):
+        broken.transcribe_chunk(chunks[0])
+    assert len(calls) == 3
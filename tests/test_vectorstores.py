@@ -0,0 +1,37 @@
+import pytest
+from langchain.docstore.document import Document
+from langchain.embeddings.fake import FakeEmbeddings
+
+from utils.vectorstores import ReadOnlyFAISS, load_faiss, load_or_build_faiss
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    path = str(tmp_path / "index")
+    docs = [Document(page_content=f"문서 {i}", metadata={"source": str(i)}) for i in range(20)]
+    load_or_build_faiss(path, FakeEmbeddings(size=8), lambda: iter(docs), batch_size=7)
+    return path
+
+
+def test_mmapped_index_searches(index_path):
+    vectorstore = load_faiss(index_path, FakeEmbeddings(size=8))
+    assert isinstance(vectorstore, ReadOnlyFAISS)
+    assert vectorstore.index.ntotal == 20
+    assert len(vectorstore.similarity_search("문서", k=3)) == 3
+
+
+def test_mmapped_index_refuses_writes(index_path):
+    vectorstore = load_faiss(index_path, FakeEmbeddings(size=8))
+    with pytest.raises(RuntimeError):
+        vectorstore.add_documents([Document(page_content="새 문서")])
+    with pytest.raises(RuntimeError):
+        vectorstore.add_texts(["새 문서"])
+    with pytest.raises(RuntimeError):
+        vectorstore.delete(list(vectorstore.index_to_docstore_id.values())[:1])
+    assert vectorstore.index.ntotal == 20
+
+
+def test_index_loaded_without_mmap_is_writable(index_path):
+    vectorstore = load_faiss(index_path, FakeEmbeddings(size=8), mmap=False)
+    vectorstore.add_documents([Document(page_content="새 문서")])
+    assert vectorstore.index.ntotal == 21
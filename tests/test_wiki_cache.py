@@ -0,0 +1,89 @@
+import pytest
+import requests
+
+from utils import wiki_cache
+from utils.wiki_cache import WikipediaPageCache, WikipediaSearch
+
+
+def page(title, revision):
+    return {
+        "title": title,
+        "revision": revision,
+        "url": f"https://ko.wikipedia.org/wiki/{title}",
+        "content": f"{title} r{revision}",
+    }
+
+
+class FakeWikipedia:
+    # Answers the three queries WikipediaSearch makes; `down` lists the
+    # queries that fail with a connection error.
+    def __init__(self, revisions, down=()):
+        self.revisions = revisions
+        self.down = set(down)
+
+    def __call__(self, **params):
+        kind = "search" if "list" in params else "fetch" if "explaintext" in params else "revisions"
+        if kind in self.down:
+            raise requests.ConnectionError("wikipedia is unreachable")
+        if kind == "search":
+            return {"query": {"search": [{"title": title} for title in self.revisions]}}
+        if kind == "revisions":
+            return {
+                "query": {
+                    "pages": [
+                        {"title": title, "revisions": [{"revid": self.revisions[title]}]}
+                        for title in params["titles"].split("|")
+                    ]
+                }
+            }
+        title = params["titles"]
+        return {
+            "query": {
+                "pages": [
+                    {
+                        "revisions": [{"revid": self.revisions[title]}],
+                        "fullurl": page(title, 0)["url"],
+                        "extract": page(title, self.revisions[title])["content"],
+                    }
+                ]
+            }
+        }
+
+
+@pytest.fixture
+def search(tmp_path, monkeypatch):
+    monkeypatch.setattr(wiki_cache.tiktoken, "get_encoding", lambda name: None)
+    cache = WikipediaPageCache(str(tmp_path / "wikipedia.sqlite3"))
+    cache.put_page("ko", page("서울", 1))
+    # ttl=0 makes every cached page expired, so each call checks revisions.
+    return WikipediaSearch(cache=cache, offline=False, ttl=0)
+
+
+def test_expired_page_is_served_when_revision_check_fails(search):
+    search.api = FakeWikipedia({"서울": 2}, down={"revisions", "fetch"})
+    assert [p["content"] for p in search.get_pages(["서울"])] == ["서울 r1"]
+
+
+def test_expired_page_is_served_when_new_revision_fetch_fails(search):
+    search.api = FakeWikipedia({"서울": 2}, down={"fetch"})
+    assert [p["content"] for p in search.get_pages(["서울"])] == ["서울 r1"]
+
+
+def test_pages_that_can_be_fetched_are_still_returned(search):
+    search.api = FakeWikipedia({"서울": 2, "부산": 1})
+    assert [p["content"] for p in search.get_pages(["서울", "부산"])] == ["서울 r2", "부산 r1"]
+
+
+def test_failure_is_raised_when_nothing_is_cached(search):
+    search.api = FakeWikipedia({"부산": 1}, down={"fetch"})
+    with pytest.raises(requests.ConnectionError):
+        search.get_pages(["부산"])
+
+
+def test_search_falls_back_to_cached_titles(search):
+    search.api = FakeWikipedia({"서울": 1})
+    assert search.search_titles("수도") == ["서울"]
+    search.api = FakeWikipedia({"서울": 1}, down={"search"})
+    assert search.search_titles("수도") == ["서울"]
+    with pytest.raises(requests.ConnectionError):
+        search.search_titles("항구")
@@ -0,0 +1,101 @@
+import time
+
+TERMINAL_STATUSES = {"completed", "failed", "cancelled", "expired", "incomplete"}
+FAILED_EVENTS = {
+    "thread.run.failed": "failed",
+    "thread.run.cancelled": "cancelled",
+    "thread.run.expired": "expired",
+    "thread.run.incomplete": "incomplete",
+}
+
+
+class RunFailed(Exception):
+    def __init__(self, status):
+        super().__init__(f"어시스턴트 실행이 {status} 상태로 끝났습니다.")
+        self.status = status
+
+
+class RunDriver:
+    # Drives an Assistants run to completion. With the streaming events API
+    # text deltas reach `on_text` as they are generated and `requires_action`
+    # is handled the moment it arrives; without it the run is polled with
+    # exponential backoff and a single status fetch per tick.
+    def __init__(
+        self,
+        client,
+        handle_tool_calls=None,
+        on_text=None,
+        initial_delay=0.1,
+        max_delay=2.0,
+        backoff=2.0,
+        sleep=time.sleep,
+    ):
+        self.client = client
+        self.handle_tool_calls = handle_tool_calls
+        self.on_text = on_text or (lambda text: None)
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.sleep = sleep
+
+    @property
+    def runs(self):
+        return self.client.beta.threads.runs
+
+    def tool_outputs(self, run):
+        if self.handle_tool_calls is None:
+            raise RunFailed(run.status)
+        return self.handle_tool_calls(run.required_action.submit_tool_outputs.tool_calls)
+
+    def run(self, thread_id, assistant_id):
+        if hasattr(self.runs, "stream"):
+            return self.stream(thread_id, assistant_id)
+        return self.poll(thread_id, assistant_id)
+
+    def stream(self, thread_id, assistant_id):
+        parts = []
+        manager = self.runs.stream(thread_id=thread_id, assistant_id=assistant_id)
+        while manager is not None:
+            with manager as events:
+                manager = None
+                for event in events:
+                    if event.event == "thread.message.created" and parts:
+                        parts.append("\n\n")
+                        self.on_text("\n\n")
+                    elif event.event == "thread.message.delta":
+                        for content in event.data.delta.content or []:
+                            if content.type == "text" and content.text.value:
+                                parts.append(content.text.value)
+                                self.on_text(content.text.value)
+                    elif event.event == "thread.run.requires_action":
+                        manager = self.runs.submit_tool_outputs_stream(
+                            thread_id=thread_id,
+                            run_id=event.data.id,
+                            tool_outputs=self.tool_outputs(event.data),
+                        )
+                        break
+                    elif event.event in FAILED_EVENTS:
+                        raise RunFailed(FAILED_EVENTS[event.event])
+        return "".join(parts)
+
+    def poll(self, thread_id, assistant_id):
+        run = self.runs.create(thread_id=thread_id, assistant_id=assistant_id)
+        delay = self.initial_delay
+        while run.status not in TERMINAL_STATUSES:
+            if run.status == "requires_action":
+                run = self.runs.submit_tool_outputs(
+                    thread_id=thread_id, run_id=run.id, tool_outputs=self.tool_outputs(run)
+                )
+                delay = self.initial_delay
+                continue
+            self.sleep(delay)
+            delay = min(delay * self.backoff, self.max_delay)
+            run = self.runs.retrieve(run_id=run.id, thread_id=thread_id)
+        if run.status != "completed":
+            raise RunFailed(run.status)
+        messages = self.client.beta.threads.messages.list(
+            thread_id=thread_id, order="desc", limit=1
+        )
+        text = next(iter(messages)).content[0].text.value
+        self.on_text(text)
+        return text
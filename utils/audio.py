@@ -0,0 +1,160 @@
+import json
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from utils.files import atomic_open, atomic_path
+
+MANIFEST_FILE = "chunks.json"
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.02
+SMOOTH_SECONDS = 0.3
+READ_SIZE = 1 << 16
+
+
+def frame_rms(samples, frame_length):
+    usable = len(samples) - len(samples) % frame_length
+    frames = samples[:usable].reshape(-1, frame_length).astype(np.float32)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+
+def find_cut(samples, target, search, frame_length, smooth_frames=1):
+    # Picks the quietest stretch within `search` samples of `target`,
+    # smoothing the frame energy so a single quiet frame inside a word does
+    # not win over a real pause. Ties go to the point closest to `target`.
+    low = max(target - search, 0)
+    rms = frame_rms(samples[low : target + search], frame_length)
+    if len(rms) == 0:
+        return target
+    if smooth_frames > 1:
+        rms = np.convolve(rms, np.ones(smooth_frames) / smooth_frames, mode="same")
+    centers = low + np.arange(len(rms)) * frame_length + frame_length // 2
+    distance = np.abs(centers - target) / max(search, 1)
+    score = rms + distance * (rms.mean() * 0.1 + 1e-3)
+    return int(centers[np.argmin(score)])
+
+
+def write_chunk(samples, path):
+    with atomic_path(path) as tmp_path:
+        subprocess.run(
+            [
+                "ffmpeg",
+                "-y",
+                "-loglevel",
+                "error",
+                "-f",
+                "s16le",
+                "-ar",
+                str(SAMPLE_RATE),
+                "-ac",
+                "1",
+                "-i",
+                "pipe:0",
+                "-c:a",
+                "libmp3lame",
+                "-b:a",
+                "64k",
+                "-f",
+                "mp3",
+                tmp_path,
+            ],
+            input=samples.tobytes(),
+            check=True,
+        )
+
+
+def load_chunks(chunks_folder):
+    # One entry per chunk: the meeting time its audio starts at, and the
+    # time from which it owns the transcript (its start plus any overlap).
+    with open(os.path.join(chunks_folder, MANIFEST_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def segment_audio(
+    video_path,
+    chunks_folder,
+    chunk_seconds=600,
+    search_seconds=30,
+    overlap_seconds=0,
+    encode_workers=2,
+):
+    # ffmpeg decodes the audio track once into 16 kHz mono PCM on a pipe.
+    # Only the current chunk plus the search window is held in memory, and
+    # every cut lands in the quietest spot within `search_seconds` of the
+    # target length so words are not split at the seams. With
+    # `overlap_seconds`, each chunk also repeats the audio just before its
+    # cut; utils.transcription.stitch_transcripts removes the repeated words.
+    # mp3 encoding is the slow part, so finished chunks are encoded in
+    # separate ffmpeg processes while decoding continues, and yielded in order.
+    manifest_path = os.path.join(chunks_folder, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        for chunk in load_chunks(chunks_folder):
+            yield os.path.join(chunks_folder, chunk["file"])
+        return
+    os.makedirs(chunks_folder, exist_ok=True)
+    target = int(chunk_seconds * SAMPLE_RATE)
+    search = int(search_seconds * SAMPLE_RATE)
+    overlap = int(overlap_seconds * SAMPLE_RATE)
+    frame_length = int(FRAME_SECONDS * SAMPLE_RATE)
+    smooth_frames = max(int(SMOOTH_SECONDS / FRAME_SECONDS), 1)
+    process = subprocess.Popen(
+        [
+            "ffmpeg",
+            "-loglevel",
+            "error",
+            "-i",
+            video_path,
+            "-vn",
+            "-ac",
+            "1",
+            "-ar",
+            str(SAMPLE_RATE),
+            "-f",
+            "s16le",
+            "pipe:1",
+        ],
+        stdout=subprocess.PIPE,
+    )
+    blocks, buffered, head, index, pending = [], 0, 0, 0, []
+    # Meeting position, in samples, of the first sample in `blocks`.
+    offset, chunks = 0, []
+    with ThreadPoolExecutor(max_workers=encode_workers) as executor:
+        while True:
+            data = process.stdout.read(READ_SIZE)
+            if data:
+                blocks.append(np.frombuffer(data[: len(data) - len(data) % 2], np.int16))
+                buffered += len(blocks[-1])
+                if buffered < head + target + search:
+                    continue
+            samples = np.concatenate(blocks) if blocks else np.empty(0, np.int16)
+            if data:
+                cut = find_cut(samples, head + target, search, frame_length, smooth_frames)
+            else:
+                cut = len(samples)
+            if cut > head:
+                path = os.path.join(chunks_folder, f"{index:03d}_chunk.mp3")
+                pending.append((path, executor.submit(write_chunk, samples[:cut], path)))
+                chunks.append(
+                    {
+                        "file": os.path.basename(path),
+                        "start": offset / SAMPLE_RATE,
+                        "owned_from": (offset + head) / SAMPLE_RATE,
+                    }
+                )
+                index += 1
+            while pending and (pending[0][1].done() or not data):
+                path, future = pending.pop(0)
+                future.result()
+                yield path
+            if not data:
+                break
+            # The next chunk starts `overlap` samples before this cut.
+            keep = max(cut - overlap, 0)
+            blocks, buffered, head = [samples[keep:]], len(samples) - keep, cut - keep
+            offset += keep
+    if process.wait() != 0:
+        raise RuntimeError(f"ffmpeg가 {video_path}의 소리를 분할하지 못했습니다.")
+    with atomic_open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(chunks, f)
@@ -0,0 +1,228 @@
+import asyncio
+import gzip
+import logging
+import queue
+import random
+import threading
+import time
+import zlib
+from urllib.parse import urlparse
+from xml.etree import ElementTree
+
+import aiohttp
+
+from utils.sqlite import connect
+
+DEFAULT_CACHE_PATH = "./.cache/site_http.sqlite3"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+logger = logging.getLogger(__name__)
+
+
+class HttpCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.lock = threading.Lock()
+        self.connection = connect(path)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body BLOB NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+
+    def get(self, url):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT etag, last_modified, body FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, body = row
+        return etag, last_modified, zlib.decompress(body)
+
+    def put(self, url, etag, last_modified, body):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, zlib.compress(body), time.time()),
+            )
+
+
+class HostLimiter:
+    def __init__(self, concurrency, delay):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.delay = delay
+        self.next_slot = 0
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        now = asyncio.get_running_loop().time()
+        wait = self.next_slot - now
+        self.next_slot = max(now, self.next_slot) + self.delay
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def __aexit__(self, *args):
+        self.semaphore.release()
+
+
+def local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_sitemap(body):
+    root = ElementTree.fromstring(body)
+    children = []
+    for node in root:
+        entry = {local_name(child.tag): (child.text or "").strip() for child in node}
+        if entry.get("loc"):
+            children.append(entry)
+    return local_name(root.tag) == "sitemapindex", children
+
+
+class SitemapCrawler:
+    def __init__(
+        self,
+        concurrency=32,
+        per_host_concurrency=4,
+        delay=0.1,
+        retries=3,
+        backoff=0.5,
+        timeout=30,
+        user_agent="FullstackGPT SiteGPT crawler",
+        cache_path=DEFAULT_CACHE_PATH,
+    ):
+        self.concurrency = concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.delay = delay
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.cache = HttpCache(cache_path)
+        self.hosts = {}
+        self.failed = []
+
+    def _limiter(self, url):
+        host = urlparse(url).netloc
+        if host not in self.hosts:
+            self.hosts[host] = HostLimiter(self.per_host_concurrency, self.delay)
+        return self.hosts[host]
+
+    async def fetch(self, session, url):
+        cached = self.cache.get(url)
+        headers = {}
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            try:
+                async with self._limiter(url):
+                    async with session.get(url, headers=headers) as response:
+                        if response.status == 304 and cached:
+                            return cached[2]
+                        if response.status not in RETRY_STATUSES:
+                            response.raise_for_status()
+                            body = await response.read()
+                            if body[:2] == b"\x1f\x8b":
+                                body = gzip.decompress(body)
+                            self.cache.put(
+                                url,
+                                response.headers.get("ETag"),
+                                response.headers.get("Last-Modified"),
+                                body,
+                            )
+                            return body
+                        retry_after = response.headers.get("Retry-After")
+                        error = aiohttp.ClientResponseError(
+                            response.request_info,
+                            response.history,
+                            status=response.status,
+                        )
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error = e
+            if attempt == self.retries:
+                raise error
+            if retry_after and retry_after.isdigit():
+                await asyncio.sleep(int(retry_after))
+            else:
+                await asyncio.sleep(self.backoff * 2**attempt * (1 + random.random()))
+
+    async def read_sitemap(self, session, url):
+        is_index, children = parse_sitemap(await self.fetch(session, url))
+        if not is_index:
+            return children
+        nested = await asyncio.gather(
+            *(self.read_sitemap(session, child["loc"]) for child in children)
+        )
+        return [entry for entries in nested for entry in entries]
+
+    def _session(self):
+        self.hosts = {}
+        return aiohttp.ClientSession(
+            headers={"User-Agent": self.user_agent},
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+        )
+
+    def list_entries(self, sitemap_url):
+        async def read():
+            async with self._session() as session:
+                return await self.read_sitemap(session, sitemap_url)
+
+        return asyncio.run(read())
+
+    async def crawl(self, sitemap_url, entries=None):
+        # Pages that still fail after the retries are skipped and their URLs
+        # collected in `self.failed` for the caller to report.
+        self.failed = []
+        async with self._session() as session:
+            if entries is None:
+                entries = await self.read_sitemap(session, sitemap_url)
+            pages = asyncio.Queue()
+
+            async def fetch_page(entry):
+                try:
+                    await pages.put((entry, await self.fetch(session, entry["loc"])))
+                except Exception as e:
+                    logger.warning("%s 불러오기 실패: %s", entry["loc"], e)
+                    self.failed.append(entry["loc"])
+                    await pages.put((entry, None))
+
+            tasks = [asyncio.create_task(fetch_page(entry)) for entry in entries]
+            for _ in tasks:
+                entry, body = await pages.get()
+                if body is not None:
+                    yield entry, body
+
+    def iter_pages(self, sitemap_url, entries=None):
+        # Runs the crawl on its own event loop so pages can be parsed and
+        # embedded by the caller while the rest are still downloading.
+        pages = queue.Queue()
+        done = object()
+
+        async def produce():
+            async for page in self.crawl(sitemap_url, entries):
+                pages.put(page)
+
+        def run():
+            try:
+                asyncio.run(produce())
+            except Exception as e:
+                pages.put(e)
+            pages.put(done)
+
+        threading.Thread(target=run, daemon=True).start()
+        while (page := pages.get()) is not done:
+            if isinstance(page, Exception):
+                raise page
+            yield page
@@ -0,0 +1,50 @@
+import gzip
+import hashlib
+import json
+import os
+
+from langchain.document_loaders import UnstructuredFileLoader
+from langchain.schema import Document
+from langchain.text_splitter import CharacterTextSplitter
+
+from utils.files import write_atomic
+
+CACHE_PATH = "./.cache/documents"
+
+
+def save_documents(path, docs):
+    lines = (
+        json.dumps(
+            {"page_content": doc.page_content, "metadata": doc.metadata},
+            ensure_ascii=False,
+        )
+        for doc in docs
+    )
+    write_atomic(path, gzip.compress("\n".join(lines).encode("utf-8")))
+
+
+def read_documents(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [Document(**json.loads(line)) for line in f if line.strip()]
+
+
+def load_and_split_file(file, chunk_size=600, chunk_overlap=100):
+    file_content = file.getvalue()
+    file_hash = hashlib.sha256(file_content).hexdigest()
+    folder = os.path.join(CACHE_PATH, file_hash)
+    chunks_path = os.path.join(folder, f"chunks-{chunk_size}-{chunk_overlap}.jsonl.gz")
+    if os.path.exists(chunks_path):
+        return file_hash, read_documents(chunks_path)
+    os.makedirs(folder, exist_ok=True)
+    file_path = os.path.join(folder, f"source{os.path.splitext(file.name)[1]}")
+    if not os.path.exists(file_path):
+        write_atomic(file_path, file_content)
+    splitter = CharacterTextSplitter.from_tiktoken_encoder(
+        separator="\n", chunk_size=chunk_size, chunk_overlap=chunk_overlap
+    )
+    loader = UnstructuredFileLoader(file_path)
+    docs = loader.load_and_split(text_splitter=splitter)
+    for doc in docs:
+        doc.metadata["source"] = file.name
+    save_documents(chunks_path, docs)
+    return file_hash, docs
@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_path(path):
+    # Yields a temporary file next to `path` and moves it into place once the
+    # block finishes. mkstemp names are unique per call, so Streamlit sessions
+    # writing the same cache file from threads of one process never share a
+    # temporary file; a failed write leaves `path` untouched.
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=f"{os.path.basename(path)}.", suffix=".tmp"
+    )
+    os.close(fd)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def atomic_open(path, mode="w", **kwargs):
+    with atomic_path(path) as tmp_path, open(tmp_path, mode, **kwargs) as f:
+        yield f
+
+
+def write_atomic(path, data):
+    if isinstance(data, str):
+        with atomic_open(path, "w", encoding="utf-8") as f:
+            f.write(data)
+    else:
+        with atomic_open(path, "wb") as f:
+            f.write(data)
+
+
+@contextmanager
+def atomic_directory(path):
+    # Same as atomic_path for a directory, such as a saved FAISS index.
+    # Deleting a tree is not atomic, so the old directory is renamed aside
+    # first and removed only after the new one is in place: `path` is
+    # missing just between two renames, never while a tree is deleted, and
+    # a crash in between leaves the old index next to it.
+    parent = os.path.dirname(path) or "."
+    os.makedirs(parent, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(dir=parent, prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        yield tmp_path
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    old_path = f"{tmp_path}.old"
+    try:
+        os.rename(path, old_path)
+    except FileNotFoundError:
+        old_path = None
+    os.replace(tmp_path, path)
+    if old_path:
+        shutil.rmtree(old_path, ignore_errors=True)
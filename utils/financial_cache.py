@@ -0,0 +1,119 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from utils.sqlite import connect
+
+DEFAULT_CACHE_PATH = "./.cache/financial_data.sqlite3"
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# (fresh, stale) seconds per endpoint. Within `fresh` the cached value is
+# served as is; for `stale` seconds after that it is still served while one
+# background refresh runs.
+ENDPOINT_TTLS = {
+    "OVERVIEW": (DAY, 7 * DAY),
+    "INCOME_STATEMENT": (7 * DAY, 30 * DAY),
+    "TIME_SERIES_WEEKLY": (6 * HOUR, 2 * DAY),
+    "yfinance.income_stmt": (7 * DAY, 30 * DAY),
+    "yfinance.balance_sheet": (7 * DAY, 30 * DAY),
+    "yfinance.history_3mo": (15 * 60, DAY),
+}
+
+
+class FinancialDataCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttls=ENDPOINT_TTLS, refresh_workers=2):
+        self.ttls = ttls
+        self.lock = threading.Lock()
+        self.key_locks = {}
+        self.refreshing = set()
+        self.executor = ThreadPoolExecutor(max_workers=refresh_workers)
+        self.connection = connect(path)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def read(self, key):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value, fetched_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def write(self, key, value):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), time.time()),
+            )
+
+    def key_lock(self, key):
+        with self.lock:
+            return self.key_locks.setdefault(key, threading.Lock())
+
+    def get(self, endpoint, symbol, fetch):
+        key = f"{endpoint}:{symbol.strip().upper()}"
+        fresh, stale = self.ttls[endpoint]
+        entry = self.read(key)
+        if entry and time.time() - entry[1] < fresh:
+            self.hits += 1
+            return entry[0]
+        if entry and time.time() - entry[1] < fresh + stale:
+            self.stale_hits += 1
+            self.refresh(key, fetch)
+            return entry[0]
+        # Concurrent sessions asking for the same key wait on one upstream
+        # call and then read what it stored.
+        with self.key_lock(key):
+            entry = self.read(key)
+            if entry and time.time() - entry[1] < fresh:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            try:
+                value = fetch()
+            except Exception:
+                if entry:
+                    return entry[0]
+                raise
+            self.write(key, value)
+            return value
+
+    def refresh(self, key, fetch):
+        with self.lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+
+        def run():
+            try:
+                with self.key_lock(key):
+                    self.write(key, fetch())
+            except Exception:
+                pass
+            finally:
+                with self.lock:
+                    self.refreshing.discard(key)
+
+        self.executor.submit(run)
+
+    def stats(self):
+        return {"hits": self.hits, "stale_hits": self.stale_hits, "misses": self.misses}
+
+
+@lru_cache(maxsize=None)
+def get_financial_cache(path=DEFAULT_CACHE_PATH):
+    # One instance per process, so every Streamlit session and page shares
+    # the same locks as well as the same file.
+    return FinancialDataCache(path)
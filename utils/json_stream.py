@@ -0,0 +1,39 @@
+import json
+
+
+class ArrayItemParser:
+    # Incremental parser for streamed function-call arguments shaped like
+    # {"questions": [{...}, {...}]}. feed() takes the next argument delta and
+    # returns every element object of the top-level array whose closing
+    # brace has arrived, so callers can use it before the call finishes.
+    def __init__(self):
+        self.stack = []
+        self.in_string = False
+        self.escaped = False
+        self.item = None
+
+    def feed(self, text):
+        items = []
+        for char in text:
+            if self.item is not None:
+                self.item.append(char)
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                continue
+            if char == '"':
+                self.in_string = True
+            elif char in "{[":
+                if char == "{" and self.stack == ["{", "["]:
+                    self.item = [char]
+                self.stack.append(char)
+            elif char in "}]" and self.stack:
+                self.stack.pop()
+                if char == "}" and self.item is not None and self.stack == ["{", "["]:
+                    items.append(json.loads("".join(self.item)))
+                    self.item = None
+        return items
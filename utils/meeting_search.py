@@ -0,0 +1,85 @@
+import re
+
+import faiss
+import numpy as np
+
+UNIT_SECONDS = {
+    "초": 1,
+    "분": 60,
+    "시간": 3600,
+    "second": 1,
+    "seconds": 1,
+    "minute": 60,
+    "minutes": 60,
+    "hour": 3600,
+    "hours": 3600,
+}
+UNIT = r"(초|분|시간|seconds?|minutes?|hours?)"
+LAST = re.compile(
+    rf"(?:마지막|최근|지난|끝나기\s*전|last|final)\s*(\d+(?:\.\d+)?)\s*{UNIT}",
+    re.IGNORECASE,
+)
+FIRST = re.compile(
+    rf"(?:처음|첫|시작하고|first)\s*(\d+(?:\.\d+)?)\s*{UNIT}", re.IGNORECASE
+)
+BETWEEN = re.compile(
+    rf"(\d+(?:\.\d+)?)\s*{UNIT}?\s*(?:부터|에서|~|-|to|and)\s*(\d+(?:\.\d+)?)\s*{UNIT}",
+    re.IGNORECASE,
+)
+
+
+def parse_time_range(question, duration):
+    # Returns (start, end) in seconds for phrases like "마지막 15분",
+    # "처음 10분" or "30분부터 45분까지", and None when the question does not
+    # mention a part of the meeting.
+    if match := LAST.search(question):
+        seconds = float(match.group(1)) * UNIT_SECONDS[match.group(2).lower()]
+        return max(duration - seconds, 0), duration
+    if match := FIRST.search(question):
+        return 0, float(match.group(1)) * UNIT_SECONDS[match.group(2).lower()]
+    if match := BETWEEN.search(question):
+        end_unit = UNIT_SECONDS[match.group(4).lower()]
+        start_unit = UNIT_SECONDS[(match.group(2) or match.group(4)).lower()]
+        return float(match.group(1)) * start_unit, float(match.group(3)) * end_unit
+    return None
+
+
+def format_timestamp(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+class TimeRangeSearch:
+    def __init__(self, vectorstore):
+        self.vectorstore = vectorstore
+        docs = [
+            vectorstore.docstore.search(vectorstore.index_to_docstore_id[i])
+            for i in range(vectorstore.index.ntotal)
+        ]
+        self.docs = docs
+        self.starts = np.array([doc.metadata["start"] for doc in docs])
+        self.ends = np.array([doc.metadata["end"] for doc in docs])
+        self.duration = float(self.ends.max()) if len(docs) else 0.0
+
+    def search(self, query, k=4, time_range=None):
+        # The time range selects index positions before the vector search,
+        # so a narrow question only scores the vectors from that stretch of
+        # the meeting instead of filtering a global top-k afterwards.
+        params = None
+        if time_range is not None:
+            start, end = time_range
+            ids = np.flatnonzero((self.ends > start) & (self.starts < end))
+            if len(ids) == 0:
+                return []
+            params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(ids.astype("int64")))
+        vector = np.array([self.vectorstore._embed_query(query)], dtype=np.float32)
+        if self.vectorstore._normalize_L2:
+            faiss.normalize_L2(vector)
+        _, indices = self.vectorstore.index.search(vector, k, params=params)
+        return [self.docs[i] for i in indices[0] if i != -1]
+
+    def invoke(self, question):
+        return self.search(question, time_range=parse_time_range(question, self.duration))
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import math
+import os
+import queue
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from utils.files import atomic_open
+
+CACHE_PATH = "./.cache/quiz_banks"
+CHUNK_DONE = object()
+
+
+def content_hash(docs):
+    digest = hashlib.sha256()
+    for doc in docs:
+        digest.update(doc.page_content.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def spherical_kmeans(vectors, k, iterations=20, seed=0):
+    # Cosine k-means with k-means++ seeding; the chunks are short and few
+    # enough that plain NumPy finishes in milliseconds.
+    rng = np.random.default_rng(seed)
+    centroids = vectors[[rng.integers(len(vectors))]]
+    for _ in range(1, k):
+        distance = np.clip(1 - (vectors @ centroids.T).max(axis=1), 0, None)
+        total = distance.sum()
+        if total == 0:
+            break
+        centroids = np.vstack([centroids, vectors[rng.choice(len(vectors), p=distance / total)]])
+    for _ in range(iterations):
+        labels = (vectors @ centroids.T).argmax(axis=1)
+        updated = np.array(
+            [
+                vectors[labels == i].mean(axis=0) if np.any(labels == i) else centroids[i]
+                for i in range(len(centroids))
+            ]
+        )
+        updated /= np.linalg.norm(updated, axis=1, keepdims=True)
+        if np.allclose(updated, centroids):
+            break
+        centroids = updated
+    return (vectors @ centroids.T).argmax(axis=1), centroids
+
+
+def sample_chunks(docs, embeddings, count):
+    # One representative per cluster of chunk embeddings, so a long document
+    # is covered by `count` diverse chunks instead of being sent in full.
+    if len(docs) <= count:
+        return list(docs)
+    vectors = np.array(
+        embeddings.embed_documents([doc.page_content for doc in docs]), dtype=np.float32
+    )
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    labels, centroids = spherical_kmeans(vectors, count)
+    picked = []
+    for i, centroid in enumerate(centroids):
+        members = np.flatnonzero(labels == i)
+        if len(members):
+            picked.append(members[np.argmax(vectors[members] @ centroid)])
+    return [docs[i] for i in sorted(picked)]
+
+
+def bigrams(text):
+    text = "".join(char for char in text.lower() if char.isalnum())
+    return {text[i : i + 2] for i in range(len(text) - 1)} or {text}
+
+
+def is_duplicate(grams, seen, threshold):
+    return any(len(grams & other) / len(grams | other) >= threshold for other in seen)
+
+
+class QuestionBank:
+    def __init__(self, key, cache_path=CACHE_PATH, threshold=0.7):
+        self.path = os.path.join(cache_path, f"{key}.json")
+        self.threshold = threshold
+        self.questions = []
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                self.questions = json.load(f)["questions"]
+        self.seen = [bigrams(question["question"]) for question in self.questions]
+
+    def __bool__(self):
+        return bool(self.questions)
+
+    def add(self, question):
+        # Near-duplicates (by character bigram overlap) are dropped; answers
+        # are shuffled once here so every later draw shows the same order.
+        grams = bigrams(question["question"])
+        if is_duplicate(grams, self.seen, self.threshold):
+            return False
+        answers = list(question["answers"])
+        random.shuffle(answers)
+        self.questions.append({**question, "answers": answers})
+        self.seen.append(grams)
+        return True
+
+    def build(
+        self, docs, generate, embeddings, size=10, chunks=8, headroom=1.5, max_workers=4
+    ):
+        # `generate(doc, count)` turns one chunk into an iterable of questions.
+        # The per-chunk count is spread so the sampled chunks together ask for
+        # `size` questions plus headroom for the ones dedupe drops. Chunks are
+        # generated in parallel, and every accepted question is yielded as
+        # soon as any worker produces it; the bank is saved at the end.
+        sampled = sample_chunks(docs, embeddings, chunks)
+        count = math.ceil(size * headroom / max(len(sampled), 1))
+        results = queue.Queue()
+
+        def run(doc):
+            try:
+                for question in generate(doc, count):
+                    results.put(question)
+            finally:
+                results.put(CHUNK_DONE)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(run, doc) for doc in sampled]
+            remaining = len(futures)
+            while remaining:
+                question = results.get()
+                if question is CHUNK_DONE:
+                    remaining -= 1
+                elif self.add(question):
+                    yield self.questions[-1]
+            for future in futures:
+                future.result()
+        self.save()
+
+    def save(self):
+        with atomic_open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"questions": self.questions}, f, ensure_ascii=False)
+
+    def draw(self, count=10, seed=None):
+        # Without a seed the first questions are returned in bank order,
+        # which is the order they were shown while the bank was built.
+        if seed is None:
+            return {"questions": self.questions[:count]}
+        rng = random.Random(seed)
+        return {
+            "questions": rng.sample(self.questions, min(count, len(self.questions)))
+        }
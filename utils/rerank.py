@@ -0,0 +1,53 @@
+import math
+import re
+from collections import Counter
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    tokens = []
+    for word in WORD_PATTERN.findall(text.lower()):
+        tokens.append(word)
+        # Korean words carry particles (문서는, 문서를), so character
+        # bigrams give partial matches that whole words would miss.
+        if not word.isascii():
+            tokens.extend(word[i : i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+class LexicalReranker:
+    def __init__(self, top_n=3, k1=1.2, b=0.75, rank_constant=60):
+        self.top_n = top_n
+        self.k1 = k1
+        self.b = b
+        self.rank_constant = rank_constant
+
+    def scores(self, query, docs):
+        counts = [Counter(tokenize(doc.page_content)) for doc in docs]
+        lengths = [sum(count.values()) for count in counts]
+        average_length = max(sum(lengths) / max(len(lengths), 1), 1)
+        scores = [0.0] * len(docs)
+        for term in set(tokenize(query)):
+            frequency = sum(term in count for count in counts)
+            if not frequency:
+                continue
+            idf = math.log(1 + (len(docs) - frequency + 0.5) / (frequency + 0.5))
+            for i, count in enumerate(counts):
+                tf = count[term]
+                if tf:
+                    norm = self.k1 * (1 - self.b + self.b * lengths[i] / average_length)
+                    scores[i] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def rerank(self, query, docs):
+        # docs arrive in vector-similarity order; fuse that rank with the
+        # lexical rank so neither signal alone decides what reaches the LLM.
+        scores = self.scores(query, docs)
+        lexical_order = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)
+        fused = [1 / (self.rank_constant + i + 1) for i in range(len(docs))]
+        for rank, i in enumerate(lexical_order):
+            if scores[i] > 0:
+                fused[i] += 1 / (self.rank_constant + rank + 1)
+        order = sorted(range(len(docs)), key=lambda i: fused[i], reverse=True)
+        return [docs[i] for i in order[: self.top_n]]
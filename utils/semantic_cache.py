@@ -0,0 +1,120 @@
+import json
+import re
+import threading
+import time
+
+import numpy as np
+
+from utils.sqlite import connect
+
+SOURCE_PATTERN = re.compile(r"https?://[^\s)\]]+")
+
+
+class SemanticCache:
+    # Entries live in SQLite so every Streamlit process appends to the same
+    # table; each process keeps a vector matrix in memory and pulls in rows
+    # other processes added (ids only grow) before it searches.
+    def __init__(self, path, embeddings, threshold=0.95):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.connection = connect(path)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                sources TEXT NOT NULL,
+                latency REAL NOT NULL,
+                vector BLOB NOT NULL
+            )
+            """
+        )
+        self.vectors = None
+        self.entries = []
+        self.last_id = 0
+        with self.lock:
+            self._sync()
+
+    def _sync(self):
+        (known,) = self.connection.execute(
+            "SELECT COUNT(*) FROM answers WHERE id <= ?", (self.last_id,)
+        ).fetchone()
+        if known != len(self.entries):
+            # Another process cleared the cache; start over from the table.
+            self.vectors, self.entries, self.last_id = None, [], 0
+        rows = self.connection.execute(
+            "SELECT id, question, answer, sources, latency, vector FROM answers"
+            " WHERE id > ? ORDER BY id",
+            (self.last_id,),
+        ).fetchall()
+        if not rows:
+            return
+        vectors = [np.frombuffer(row[5], dtype=np.float32) for row in rows]
+        if self.vectors is not None:
+            vectors.insert(0, self.vectors)
+        self.vectors = np.vstack(vectors)
+        self.entries.extend(
+            {
+                "question": question,
+                "answer": answer,
+                "sources": json.loads(sources),
+                "latency": latency,
+            }
+            for _, question, answer, sources, latency, _ in rows
+        )
+        self.last_id = rows[-1][0]
+
+    def lookup(self, question):
+        started = time.perf_counter()
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        vector /= max(np.linalg.norm(vector), 1e-12)
+        with self.lock:
+            self._sync()
+            if self.entries:
+                scores = self.vectors @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    entry = self.entries[best]
+                    self.hits += 1
+                    self.saved_seconds += max(
+                        entry["latency"] - (time.perf_counter() - started), 0
+                    )
+                    return entry, vector
+            self.misses += 1
+        return None, vector
+
+    def add(self, question, vector, answer, latency):
+        with self.lock:
+            with self.connection:
+                self.connection.execute(
+                    "INSERT INTO answers (question, answer, sources, latency, vector)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (
+                        question,
+                        answer,
+                        json.dumps(SOURCE_PATTERN.findall(answer), ensure_ascii=False),
+                        latency,
+                        np.asarray(vector, dtype=np.float32).tobytes(),
+                    ),
+                )
+            self._sync()
+
+    def clear(self):
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM answers")
+            self.vectors, self.entries = None, []
+
+    def stats(self):
+        with self.lock:
+            self._sync()
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_seconds": self.saved_seconds,
+        }
@@ -0,0 +1,56 @@
+def build_manifest(vector_store):
+    manifest = {}
+    for doc_id in vector_store.index_to_docstore_id.values():
+        doc = vector_store.docstore.search(doc_id)
+        entry = manifest.setdefault(
+            doc.metadata["source"],
+            {
+                "lastmod": doc.metadata.get("lastmod", ""),
+                "hash": doc.metadata.get("content_hash", ""),
+                "ids": [],
+            },
+        )
+        entry["ids"].append(doc_id)
+    return manifest
+
+
+def refresh_site(vector_store, sitemap_url, crawler, page_to_documents):
+    # The docstore metadata (source, lastmod, content_hash) is the manifest,
+    # so it is persisted together with the index and can never drift from it.
+    manifest = build_manifest(vector_store)
+    entries = crawler.list_entries(sitemap_url)
+    current = {entry["loc"] for entry in entries}
+    removed = [url for url in manifest if url not in current]
+    changed = [
+        entry
+        for entry in entries
+        if entry["loc"] not in manifest
+        or not entry.get("lastmod")
+        or entry["lastmod"] != manifest[entry["loc"]]["lastmod"]
+    ]
+    delete_ids = [doc_id for url in removed for doc_id in manifest[url]["ids"]]
+    new_docs = []
+    updated = 0
+    for entry, body in crawler.iter_pages(sitemap_url, changed):
+        docs = page_to_documents(entry, body)
+        old = manifest.get(entry["loc"])
+        if old and docs and docs[0].metadata["content_hash"] == old["hash"]:
+            for doc_id in old["ids"]:
+                vector_store.docstore.search(doc_id).metadata["lastmod"] = entry.get(
+                    "lastmod", ""
+                )
+            continue
+        if old:
+            delete_ids.extend(old["ids"])
+        new_docs.extend(docs)
+        updated += 1
+    if delete_ids:
+        vector_store.delete(delete_ids)
+    if new_docs:
+        vector_store.add_documents(new_docs)
+    return {
+        "fetched": len(changed),
+        "updated": updated,
+        "removed": len(removed),
+        "failed": crawler.failed,
+    }
@@ -0,0 +1,14 @@
+import os
+import sqlite3
+
+
+def connect(path):
+    # Connection setup shared by every on-disk cache: the connection is used
+    # from several threads behind the caller's own lock, writers from other
+    # sessions or processes wait for each other, and WAL lets reads run
+    # alongside a write. synchronous=NORMAL is durable enough for caches.
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
@@ -0,0 +1,121 @@
+import hashlib
+import threading
+import time
+
+import numpy as np
+from langchain.embeddings import CacheBackedEmbeddings
+from langchain.schema import BaseStore
+from langchain.storage import EncoderBackedStore
+
+from utils.sqlite import connect
+
+# Reads only refresh accessed_at when it is older than this, so lookups
+# stay read-only transactions in the common case.
+TOUCH_INTERVAL = 60 * 60
+
+
+class PackedByteStore(BaseStore[str, bytes]):
+    def __init__(self, path, max_bytes=None, batch_size=500):
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.connection = connect(path)
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+            """
+        )
+
+    def _batches(self, items):
+        for start in range(0, len(items), self.batch_size):
+            yield items[start : start + self.batch_size]
+
+    def mget(self, keys):
+        found = {}
+        stale = []
+        now = time.time()
+        with self.lock:
+            for batch in self._batches(list(keys)):
+                rows = self.connection.execute(
+                    "SELECT key, value, accessed_at FROM entries"
+                    f" WHERE key IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+                for key, value, accessed_at in rows:
+                    found[key] = value
+                    if now - accessed_at > TOUCH_INTERVAL:
+                        stale.append((now, key))
+            if stale:
+                with self.connection:
+                    self.connection.executemany(
+                        "UPDATE entries SET accessed_at = ? WHERE key = ?", stale
+                    )
+        return [found.get(key) for key in keys]
+
+    def mset(self, key_value_pairs):
+        now = time.time()
+        rows = [(key, value, now) for key, value in key_value_pairs]
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, accessed_at) VALUES (?, ?, ?)",
+                rows,
+            )
+            if self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        page_size = self.connection.execute("PRAGMA page_size").fetchone()[0]
+        while True:
+            page_count = self.connection.execute("PRAGMA page_count").fetchone()[0]
+            free_pages = self.connection.execute("PRAGMA freelist_count").fetchone()[0]
+            if (page_count - free_pages) * page_size <= self.max_bytes:
+                return
+            count = self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            if count == 0:
+                return
+            self.connection.execute(
+                """
+                DELETE FROM entries WHERE key IN (
+                    SELECT key FROM entries ORDER BY accessed_at LIMIT ?
+                )
+                """,
+                (max(count // 10, 1),),
+            )
+
+    def mdelete(self, keys):
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "DELETE FROM entries WHERE key = ?", [(key,) for key in keys]
+            )
+
+    def yield_keys(self, *, prefix=None):
+        with self.lock:
+            if prefix:
+                rows = self.connection.execute(
+                    "SELECT key FROM entries WHERE substr(key, 1, ?) = ?",
+                    (len(prefix), prefix),
+                ).fetchall()
+            else:
+                rows = self.connection.execute("SELECT key FROM entries").fetchall()
+        for (key,) in rows:
+            yield key
+
+
+def packed_cache_backed_embeddings(
+    embeddings, path, dtype="float32", max_bytes=None, namespace=""
+):
+    # Same role as CacheBackedEmbeddings.from_bytes_store, but vectors are
+    # stored as raw float32/float16 bytes instead of JSON text.
+    dtype = np.dtype(dtype)
+    store = EncoderBackedStore(
+        PackedByteStore(path, max_bytes=max_bytes),
+        lambda text: namespace + hashlib.sha1(text.encode("utf-8")).hexdigest(),
+        lambda vector: np.asarray(vector, dtype=dtype).tobytes(),
+        lambda value: np.frombuffer(value, dtype=dtype).astype(np.float32).tolist(),
+    )
+    return CacheBackedEmbeddings(embeddings, store)
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+
+import openai
+from langchain.schema import Document
+
+from utils.files import atomic_open
+
+DEFAULT_CACHE_PATH = "./.cache/transcripts"
+TRANSIENT_ERRORS = (
+    openai.error.APIConnectionError,
+    openai.error.APIError,
+    openai.error.RateLimitError,
+    openai.error.ServiceUnavailableError,
+    openai.error.Timeout,
+)
+
+
+def whisper_transcribe(audio_file, response_format="verbose_json"):
+    return openai.Audio.transcribe(
+        "whisper-1", audio_file, response_format=response_format
+    )
+
+
+def normalize_word(word):
+    return "".join(char for char in word.lower() if char.isalnum())
+
+
+def stitch_transcripts(texts, max_overlap_words=40, min_match_words=3):
+    # Chunks cut with an overlap start by repeating the last few seconds of
+    # the previous chunk. The longest common run of words between the tail
+    # of what we have and the head of the next text marks the seam.
+    words = []
+    for text in texts:
+        new_words = text.split()
+        if words:
+            tail = words[-max_overlap_words:]
+            head = new_words[:max_overlap_words]
+            match = SequenceMatcher(
+                None,
+                [normalize_word(word) for word in tail],
+                [normalize_word(word) for word in head],
+                autojunk=False,
+            ).find_longest_match(0, len(tail), 0, len(head))
+            if match.size >= min_match_words:
+                del words[len(words) - len(tail) + match.a + match.size :]
+                new_words = new_words[match.b + match.size :]
+        words.extend(new_words)
+    return " ".join(words)
+
+
+def merge_segments(transcripts, chunks):
+    # Segment times from Whisper are relative to their chunk. Each chunk
+    # keeps only the segments centred in the stretch it owns, so speech in
+    # an overlap is counted once.
+    segments = []
+    for i, (transcript, chunk) in enumerate(zip(transcripts, chunks)):
+        owned_to = chunks[i + 1]["owned_from"] if i + 1 < len(chunks) else None
+        for segment in transcript.get("segments", []):
+            start = chunk["start"] + segment["start"]
+            end = chunk["start"] + segment["end"]
+            middle = (start + end) / 2
+            if middle < chunk["owned_from"] or (owned_to and middle >= owned_to):
+                continue
+            segments.append(
+                {"start": start, "end": end, "text": segment["text"].strip()}
+            )
+    return segments
+
+
+def segments_to_documents(segments, window_seconds=120, source=""):
+    docs, window = [], []
+    for segment in segments:
+        if window and segment["end"] - window[0]["start"] > window_seconds:
+            docs.append(window)
+            window = []
+        window.append(segment)
+    if window:
+        docs.append(window)
+    return [
+        Document(
+            page_content=" ".join(segment["text"] for segment in window),
+            metadata={
+                "source": source,
+                "start": window[0]["start"],
+                "end": window[-1]["end"],
+            },
+        )
+        for window in docs
+    ]
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ChunkTranscriber:
+    def __init__(
+        self,
+        transcribe=whisper_transcribe,
+        cache_path=DEFAULT_CACHE_PATH,
+        max_workers=4,
+        retries=3,
+        backoff=1.0,
+        transient_errors=TRANSIENT_ERRORS,
+        response_format="verbose_json",
+    ):
+        self.transcribe = transcribe
+        self.cache_path = cache_path
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.transient_errors = transient_errors
+        self.response_format = response_format
+
+    def transcribe_chunk(self, path):
+        cache_file = os.path.join(
+            self.cache_path, f"{file_digest(path)}.{self.response_format}.json"
+        )
+        if os.path.exists(cache_file):
+            with open(cache_file, encoding="utf-8") as f:
+                return json.load(f)
+        for attempt in range(self.retries + 1):
+            try:
+                with open(path, "rb") as audio_file:
+                    result = dict(
+                        self.transcribe(audio_file, response_format=self.response_format)
+                    )
+                break
+            except self.transient_errors:
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2**attempt)
+        with atomic_open(cache_file, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False)
+        return result
+
+    def transcribe_all(self, paths):
+        # Executor.map yields results in input order, whatever order the
+        # chunks finish in.
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(self.transcribe_chunk, paths))
@@ -0,0 +1,56 @@
+import os
+import pickle
+
+from itertools import islice
+
+import faiss
+from langchain.vectorstores.faiss import FAISS
+
+from utils.files import atomic_directory
+
+# IO_FLAG_MMAP_IFC maps flat indexes as well as IVF lists; it needs the
+# faiss-cpu pinned in requirements.txt, 1.7.4 does not have it.
+MMAP_FLAGS = faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+
+
+class ReadOnlyFAISS(FAISS):
+    # A memory-mapped index is read-only: faiss aborts the whole process on a
+    # write instead of raising, so writes are refused here first. Load with
+    # mmap=False to update an index.
+    def refuse_write(self, *args, **kwargs):
+        raise RuntimeError("메모리 매핑된 인덱스는 읽기 전용입니다. mmap=False로 불러와 주세요.")
+
+    add_texts = add_embeddings = add_documents = refuse_write
+    aadd_texts = aadd_documents = refuse_write
+    delete = merge_from = refuse_write
+
+
+def save_faiss(vectorstore, path):
+    with atomic_directory(path) as tmp_path:
+        vectorstore.save_local(tmp_path)
+
+
+def load_faiss(path, embeddings, mmap=True):
+    index = faiss.read_index(
+        os.path.join(path, "index.faiss"), MMAP_FLAGS if mmap else 0
+    )
+    with open(os.path.join(path, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    vectorstore_class = ReadOnlyFAISS if mmap else FAISS
+    return vectorstore_class(embeddings, index, docstore, index_to_docstore_id)
+
+
+def load_or_build_faiss(path, embeddings, load_documents, batch_size=200):
+    if os.path.exists(os.path.join(path, "index.faiss")):
+        return load_faiss(path, embeddings)
+    # load_documents may be a generator, so embedding starts with the first
+    # batch instead of waiting for every document to be loaded.
+    documents = iter(load_documents())
+    vectorstore = None
+    while batch := list(islice(documents, batch_size)):
+        if vectorstore is None:
+            vectorstore = FAISS.from_documents(batch, embeddings)
+        else:
+            vectorstore.add_documents(batch)
+    save_faiss(vectorstore, path)
+    return vectorstore
@@ -0,0 +1,282 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import tiktoken
+from langchain.schema import Document
+
+from utils.sqlite import connect
+
+DEFAULT_CACHE_PATH = "./.cache/wikipedia.sqlite3"
+API_URL = "https://{lang}.wikipedia.org/w/api.php"
+USER_AGENT = "fullstack-gpt/1.0 (QuizGPT)"
+
+logger = logging.getLogger(__name__)
+
+
+class WikipediaPageCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.lock = threading.Lock()
+        self.connection = connect(path)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                lang TEXT NOT NULL,
+                title TEXT NOT NULL,
+                revision INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                content BLOB NOT NULL,
+                checked_at REAL NOT NULL,
+                PRIMARY KEY (lang, title, revision)
+            )
+            """
+        )
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS searches (
+                lang TEXT NOT NULL,
+                query TEXT NOT NULL,
+                titles TEXT NOT NULL,
+                checked_at REAL NOT NULL,
+                PRIMARY KEY (lang, query)
+            )
+            """
+        )
+
+    def get_search(self, lang, query):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT titles, checked_at FROM searches WHERE lang = ? AND query = ?",
+                (lang, query),
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def put_search(self, lang, query, titles):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO searches VALUES (?, ?, ?, ?)",
+                (lang, query, json.dumps(titles, ensure_ascii=False), time.time()),
+            )
+
+    def get_page(self, lang, title):
+        # Latest cached revision of the page.
+        with self.lock:
+            row = self.connection.execute(
+                """
+                SELECT revision, url, content, checked_at FROM pages
+                WHERE lang = ? AND title = ? ORDER BY revision DESC LIMIT 1
+                """,
+                (lang, title),
+            ).fetchone()
+        if row is None:
+            return None
+        revision, url, content, checked_at = row
+        return {
+            "title": title,
+            "revision": revision,
+            "url": url,
+            "content": zlib.decompress(content).decode("utf-8"),
+            "checked_at": checked_at,
+        }
+
+    def put_page(self, lang, page):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "DELETE FROM pages WHERE lang = ? AND title = ? AND revision < ?",
+                (lang, page["title"], page["revision"]),
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    lang,
+                    page["title"],
+                    page["revision"],
+                    page["url"],
+                    zlib.compress(page["content"].encode("utf-8")),
+                    time.time(),
+                ),
+            )
+
+    def touch_pages(self, lang, titles):
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "UPDATE pages SET checked_at = ? WHERE lang = ? AND title = ?",
+                [(time.time(), lang, title) for title in titles],
+            )
+
+
+class WikipediaSearch:
+    def __init__(
+        self,
+        lang="ko",
+        top_k=3,
+        max_tokens=6000,
+        ttl=7 * 24 * 3600,
+        cache=None,
+        offline=None,
+        max_workers=4,
+        timeout=10,
+    ):
+        self.lang = lang
+        self.top_k = top_k
+        self.max_tokens = max_tokens
+        self.ttl = ttl
+        self.cache = cache or WikipediaPageCache()
+        if offline is None:
+            offline = os.getenv("WIKIPEDIA_OFFLINE", "") not in ("", "0", "false")
+        self.offline = offline
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.encoding = tiktoken.get_encoding("cl100k_base")
+
+    def api(self, **params):
+        response = self.session.get(
+            API_URL.format(lang=self.lang),
+            params={"format": "json", "formatversion": 2, **params},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def search_titles(self, query):
+        cached = self.cache.get_search(self.lang, query)
+        if cached and (self.offline or time.time() - cached[1] < self.ttl):
+            return cached[0]
+        if self.offline:
+            return []
+        try:
+            result = self.api(
+                action="query", list="search", srsearch=query, srlimit=self.top_k
+            )
+        except requests.RequestException as e:
+            if cached is None:
+                raise
+            logger.warning("위키백과 검색 실패, 캐시된 결과를 사용합니다: %s", e)
+            return cached[0]
+        titles = [hit["title"] for hit in result["query"]["search"]]
+        self.cache.put_search(self.lang, query, titles)
+        return titles
+
+    def latest_revisions(self, titles):
+        # One request checks the current revision of every title.
+        result = self.api(
+            action="query", prop="revisions", rvprop="ids", titles="|".join(titles)
+        )
+        return {
+            page["title"]: page["revisions"][0]["revid"]
+            for page in result["query"]["pages"]
+            if page.get("revisions")
+        }
+
+    def fetch_page(self, title):
+        result = self.api(
+            action="query",
+            prop="extracts|revisions|info",
+            explaintext=1,
+            rvprop="ids",
+            inprop="url",
+            titles=title,
+        )
+        page = result["query"]["pages"][0]
+        return {
+            "title": title,
+            "revision": page["revisions"][0]["revid"],
+            "url": page["fullurl"],
+            "content": page.get("extract", ""),
+        }
+
+    def try_fetch_page(self, title):
+        try:
+            return self.fetch_page(title)
+        except requests.RequestException as e:
+            logger.warning("위키백과 문서 %s 불러오기 실패: %s", title, e)
+            return e
+
+    def get_pages(self, titles):
+        # When Wikipedia cannot be reached, expired pages are served from the
+        # cache as they are; an error is raised only if no page is left.
+        pages = {title: self.cache.get_page(self.lang, title) for title in titles}
+        now = time.time()
+        stale = [
+            title
+            for title, page in pages.items()
+            if page is None or now - page["checked_at"] >= self.ttl
+        ]
+        errors = []
+        if stale and not self.offline:
+            # Expired pages whose revision has not changed are only re-dated;
+            # new and changed pages are fetched concurrently.
+            cached = [title for title in stale if pages[title]]
+            try:
+                revisions = self.latest_revisions(cached) if cached else {}
+            except requests.RequestException as e:
+                logger.warning("위키백과 리비전 확인 실패, 캐시된 문서를 사용합니다: %s", e)
+                errors.append(e)
+                stale = [title for title in stale if not pages[title]]
+                cached, revisions = [], {}
+            unchanged = [
+                title for title in cached if pages[title]["revision"] == revisions.get(title)
+            ]
+            self.cache.touch_pages(self.lang, unchanged)
+            missing = [
+                title
+                for title in stale
+                if title not in unchanged and (not pages[title] or title in revisions)
+            ]
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for page in executor.map(self.try_fetch_page, missing):
+                    if isinstance(page, Exception):
+                        errors.append(page)
+                        continue
+                    self.cache.put_page(self.lang, page)
+                    pages[page["title"]] = page
+        found = [pages[title] for title in titles if pages[title]]
+        if errors and not found:
+            raise errors[0]
+        return found
+
+    def truncate(self, text, max_tokens):
+        tokens = self.encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        return self.encoding.decode(tokens[:max_tokens])
+
+    def get_relevant_documents(self, query):
+        pages = self.get_pages(self.search_titles(query))
+        if not pages:
+            return []
+        budget = self.max_tokens // len(pages)
+        return [
+            Document(
+                page_content=self.truncate(page["content"], budget),
+                metadata={
+                    "title": page["title"],
+                    "source": page["url"],
+                    "revision": page["revision"],
+                },
+            )
+            for page in pages
+        ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="위키피디아 페이지 캐시를 미리 채웁니다.")
+    parser.add_argument("topics", nargs="+")
+    parser.add_argument("--lang", default="ko")
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    search = WikipediaSearch(lang=args.lang, top_k=args.top_k, offline=False)
+    for topic in args.topics:
+        docs = search.get_relevant_documents(topic)
+        print(f"{topic}: {', '.join(doc.metadata['title'] for doc in docs)}")